@@ -3,12 +3,17 @@ FastAPI Web API for Library Management System
 Aşama 3: FastAPI ile Kendi API'nizi Oluşturma
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import contextmanager
+from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Dict, Any
-from library import Library, Book, fetch_book_details_by_isbn
+from library import Library, Book
+from fetcher import OpenLibraryFetcher, FetchStatus
+from enrichment import EnrichmentJob
+from registry import LibraryRegistry
 import json
 import os
+import threading
 
 app = FastAPI(
     title="Library Management API",
@@ -17,8 +22,23 @@ app = FastAPI(
 )
 
 # Global library instance with persistence
-DATA_FILE = "api_library_data.json"
-library = Library.load_from_file(DATA_FILE, default_name="API Library")
+DATA_FILE = os.environ.get("LIBRARY_DATA_FILE", "api_library_data.json")
+# Bellekte tutulacak en fazla kitap sayısı (her kütüphane için); fazlası diske taşınır
+MAX_RESIDENT_BOOKS = int(os.environ["LIBRARY_MAX_RESIDENT_BOOKS"]) if os.environ.get("LIBRARY_MAX_RESIDENT_BOOKS") else None
+library = Library.load_from_file(DATA_FILE, default_name="API Library", max_resident_books=MAX_RESIDENT_BOOKS)
+# Bulanık arama indeksi arka planda kurulur; ilk arama isteği beklemesin
+threading.Thread(target=library.build_search_index, daemon=True).start()
+
+# Named per-branch libraries, loaded lazily and evicted under a memory budget
+LIBRARIES_DIR = os.environ.get("LIBRARIES_DIR", "libraries")
+registry = LibraryRegistry(LIBRARIES_DIR, max_resident_books=MAX_RESIDENT_BOOKS)
+
+# Shared Open Library client: rate limit, retries and circuit breaker apply across requests
+fetcher = OpenLibraryFetcher.from_env()
+
+# At most one background metadata refresh runs at a time
+enrichment_job: EnrichmentJob | None = None
+_enrichment_lock = threading.Lock()
 
 # Pydantic models for request/response validation
 class BookResponse(BaseModel):
@@ -37,6 +57,47 @@ class MessageResponse(BaseModel):
     message: str
     success: bool
 
+class LibraryBookResponse(BaseModel):
+    library: str
+    book: BookResponse
+
+class RegistryStats(BaseModel):
+    loaded: List[str]
+    estimated_bytes: int
+    memory_budget_bytes: int
+    loads: int
+    evictions: int
+    save_failures: int = 0
+    indexed_isbns: int | None = None
+
+class MemoryStats(BaseModel):
+    total_books: int
+    resident_books: int
+    spilled_books: int
+    max_resident_books: int | None = None
+    spill_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    spill_writes: int
+
+class EnrichmentRequest(BaseModel):
+    workers: int = 4
+    batch_size: int = 50
+
+class EnrichmentStatus(BaseModel):
+    state: str
+    total: int = 0
+    processed: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    not_found: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    throughput: float = 0.0
+    error: str | None = None
+
 # Helper function to convert Book objects to BookResponse
 def book_to_response(book: Book) -> BookResponse:
     book_type = book.__class__.__name__
@@ -50,6 +111,49 @@ def book_to_response(book: Book) -> BookResponse:
         duration=getattr(book, 'duration', None)
     )
 
+def fetch_details_or_raise(isbn: str) -> tuple[str, str]:
+    """Looks the ISBN up on Open Library and maps failures to HTTP errors.
+
+    Blocks (rate limiter, retry backoff, HTTP); only call it from plain `def`
+    routes, which FastAPI runs in its threadpool instead of on the event loop.
+    """
+    result = fetcher.fetch(isbn)
+    if result.status is FetchStatus.NOT_FOUND or result.status is FetchStatus.INVALID_ISBN:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Book with ISBN {isbn} not found in Open Library"
+        )
+    if result.status is FetchStatus.RATE_LIMITED:
+        raise HTTPException(
+            status_code=429,
+            detail="Open Library rate limit reached, please retry later"
+        )
+    if result.status is FetchStatus.CIRCUIT_OPEN:
+        raise HTTPException(
+            status_code=503,
+            detail="Open Library is temporarily unavailable"
+        )
+    if not result.ok:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Open Library lookup failed: {result.error}"
+        )
+    return result.details
+
+@contextmanager
+def named_library(name: str):
+    """Leases a registry library for the rest of the request (so it is not evicted meanwhile) or raises 400/404."""
+    try:
+        lib = registry.checkout(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Library {name} not found")
+    try:
+        yield lib
+    finally:
+        registry.checkin(name)
+
 # API Endpoints
 
 @app.get("/", response_model=Dict[str, str])
@@ -67,8 +171,31 @@ async def get_books():
     books = library.list_books()
     return [book_to_response(book) for book in books]
 
+@app.get("/books/search", response_model=List[BookResponse])
+def search_books(
+    q: str = Query(..., min_length=1),
+    fuzzy: bool = False,
+    field: str = Query("any", pattern="^(any|title|author)$"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """
+    GET /books/search: Başlık ve/veya yazarda arama yapar. `fuzzy=true` ile yazım
+    hatalarına toleranslı (trigram indeksli) arama kullanılır. İndeks kurulumu
+    sürüyorsa beklenir; bu yüzden event loop yerine threadpool'da çalışır.
+    """
+    if fuzzy:
+        books = library.search_books(q, limit=limit, field=field)
+    else:
+        needle = q.strip().lower()
+        fields = ("title", "author") if field == "any" else (field,)
+        books = [
+            book for book in library.list_books()
+            if any(needle in getattr(book, name).lower() for name in fields)
+        ][:limit]
+    return [book_to_response(book) for book in books]
+
 @app.post("/books", response_model=BookResponse)
-async def add_book(isbn_request: ISBNRequest):
+def add_book(isbn_request: ISBNRequest):
     """
     POST /books: Request body'sinde bir ISBN alır, Open Library'den verileri çeker 
     ve kitabı kütüphaneye ekler.
@@ -87,21 +214,19 @@ async def add_book(isbn_request: ISBNRequest):
         )
     
     # Fetch book details from Open Library
-    book_details = fetch_book_details_by_isbn(isbn)
-    if not book_details:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Book with ISBN {isbn} not found in Open Library"
-        )
-    
-    title, authors = book_details
+    title, authors = fetch_details_or_raise(isbn)
     
-    # Create and add the book
+    # Create, add and save the book; the lock keeps background jobs and other requests out
     new_book = Book(title=title, author=authors, isbn=isbn)
-    library.add_book(new_book)
-    
-    # Save to file
-    library.save_to_file(DATA_FILE)
+    with library.lock:
+        # Lookup sırasında başka bir istek aynı kitabı eklemiş olabilir
+        if library.find_book_by_isbn(isbn):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Book with ISBN {isbn} already exists in library"
+            )
+        library.add_book(new_book)
+        library.save_to_file(DATA_FILE)
     
     return book_to_response(new_book)
 
@@ -113,8 +238,11 @@ async def delete_book(isbn: str):
     if not isbn:
         raise HTTPException(status_code=400, detail="ISBN cannot be empty")
     
-    # Try to remove the book
-    success = library.remove_book_by_isbn(isbn)
+    # Try to remove the book and save in one step
+    with library.lock:
+        success = library.remove_book_by_isbn(isbn)
+        if success:
+            library.save_to_file(DATA_FILE)
     
     if not success:
         raise HTTPException(
@@ -122,9 +250,6 @@ async def delete_book(isbn: str):
             detail=f"Book with ISBN {isbn} not found in library"
         )
     
-    # Save to file
-    library.save_to_file(DATA_FILE)
-    
     return MessageResponse(
         message=f"Book with ISBN {isbn} successfully removed",
         success=True
@@ -147,10 +272,130 @@ async def get_book_by_isbn(isbn: str):
     
     return book_to_response(book)
 
+@app.get("/libraries", response_model=List[str])
+async def list_libraries():
+    """GET /libraries: Kayıtlı tüm şube kütüphanelerinin adlarını döndürür."""
+    return registry.names()
+
+@app.get("/libraries/stats", response_model=RegistryStats)
+async def get_registry_stats():
+    """GET /libraries/stats: Bellekteki kütüphaneleri, tahmini bellek kullanımını ve tahliye sayılarını döndürür."""
+    return RegistryStats(**registry.stats())
+
+@app.get("/libraries/{name}/books", response_model=List[BookResponse])
+async def get_library_books(name: str):
+    """GET /libraries/{name}/books: Belirtilen kütüphanedeki tüm kitapları döndürür."""
+    with named_library(name) as lib:
+        return [book_to_response(book) for book in lib.list_books()]
+
+@app.post("/libraries/{name}/books", response_model=BookResponse)
+def add_library_book(name: str, isbn_request: ISBNRequest):
+    """
+    POST /libraries/{name}/books: ISBN ile Open Library'den verileri çeker ve kitabı
+    belirtilen kütüphaneye ekler. Kütüphane yoksa oluşturulur.
+    """
+    isbn = isbn_request.isbn.strip()
+    if not isbn:
+        raise HTTPException(status_code=400, detail="ISBN cannot be empty")
+
+    try:
+        exists = registry.exists(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if exists:
+        with named_library(name) as lib:
+            if lib.find_book_by_isbn(isbn):
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Book with ISBN {isbn} already exists in library"
+                )
+
+    title, authors = fetch_details_or_raise(isbn)
+    new_book = Book(title=title, author=authors, isbn=isbn)
+    registry.add_book(name, new_book)
+    return book_to_response(new_book)
+
+@app.get("/libraries/{name}/books/{isbn}", response_model=BookResponse)
+async def get_library_book(name: str, isbn: str):
+    """GET /libraries/{name}/books/{isbn}: Belirtilen kütüphanedeki kitabı döndürür."""
+    with named_library(name) as lib:
+        book = lib.find_book_by_isbn(isbn.strip())
+    if not book:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Book with ISBN {isbn} not found in library"
+        )
+    return book_to_response(book)
+
+@app.delete("/libraries/{name}/books/{isbn}", response_model=MessageResponse)
+async def delete_library_book(name: str, isbn: str):
+    """DELETE /libraries/{name}/books/{isbn}: Kitabı belirtilen kütüphaneden siler."""
+    isbn = isbn.strip()
+    if not isbn:
+        raise HTTPException(status_code=400, detail="ISBN cannot be empty")
+    with named_library(name):
+        removed = registry.remove_book(name, isbn)
+    if not removed:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Book with ISBN {isbn} not found in library"
+        )
+    return MessageResponse(
+        message=f"Book with ISBN {isbn} successfully removed",
+        success=True
+    )
+
+@app.get("/isbn/{isbn}", response_model=List[LibraryBookResponse])
+async def find_isbn_across_libraries(isbn: str):
+    """GET /isbn/{isbn}: ISBN'i tüm şube kütüphanelerinde arar (global indeks üzerinden)."""
+    hits = registry.find_by_isbn(isbn.strip())
+    return [LibraryBookResponse(library=name, book=book_to_response(book)) for name, book in hits]
+
+@app.post("/enrichment", response_model=EnrichmentStatus, status_code=202)
+async def start_enrichment(request: EnrichmentRequest | None = None):
+    """POST /enrichment: Tüm kitapların başlık/yazar bilgisini arka planda Open Library'den yeniler."""
+    global enrichment_job
+    request = request or EnrichmentRequest()
+    if request.workers < 1 or request.batch_size < 1:
+        raise HTTPException(status_code=400, detail="workers and batch_size must be positive")
+
+    with _enrichment_lock:
+        if enrichment_job is not None and enrichment_job.progress.state in ("pending", "running"):
+            raise HTTPException(status_code=409, detail="Enrichment job is already running")
+        data_file = DATA_FILE
+        job = EnrichmentJob(
+            library,
+            fetcher,
+            workers=request.workers,
+            batch_size=request.batch_size,
+            checkpoint_path=f"{data_file}.enrich.json",
+            on_batch=lambda lib: lib.save_to_file(data_file),
+        )
+        enrichment_job = job
+    threading.Thread(target=job.run, daemon=True).start()
+    return EnrichmentStatus(**job.progress.to_dict())
+
+@app.get("/enrichment", response_model=EnrichmentStatus)
+async def get_enrichment_status():
+    """GET /enrichment: Son metadata yenileme işinin ilerlemesini ve hızını döndürür."""
+    if enrichment_job is None:
+        return EnrichmentStatus(state="idle")
+    return EnrichmentStatus(**enrichment_job.progress.to_dict())
+
+@app.get("/stats/memory", response_model=MemoryStats)
+async def get_memory_stats():
+    """GET /stats/memory: Bellekteki/diske taşınmış kitap sayılarını ve önbellek isabet istatistiklerini döndürür."""
+    return MemoryStats(**library.memory_stats())
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "library_name": library.name}
+    report = library.load_report
+    return {
+        "status": "healthy",
+        "library_name": library.name,
+        "load_errors": len(report.errors) if report is not None else 0,
+    }
 
 if __name__ == "__main__":
     import uvicorn
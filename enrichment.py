@@ -0,0 +1,234 @@
+"""
+Background metadata refresh: re-fetches title/author for every book from Open Library.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Callable
+
+from library import Library, Book
+from fetcher import OpenLibraryFetcher, FetchResult, FetchStatus
+
+
+@dataclass
+class EnrichmentProgress:
+    """Counters for a running or finished enrichment job."""
+    total: int = 0
+    processed: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    not_found: int = 0
+    failed: int = 0
+    skipped: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+    state: str = "pending"
+    error: str | None = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Processed books per second."""
+        elapsed = self.elapsed
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        del data["started_at"], data["finished_at"]
+        data["elapsed"] = round(self.elapsed, 3)
+        data["throughput"] = round(self.throughput, 2)
+        return data
+
+
+class EnrichmentJob:
+    """Walks the library and refreshes book metadata using a bounded thread pool.
+
+    Books are loaded and processed in batches of `batch_size` (a library with a
+    memory budget is never materialized as a whole): each batch is fanned out to
+    `workers` threads, updates are applied together, `on_batch` is called (e.g.
+    to save the library) and the checkpoint is written. An interrupted job
+    resumes from the checkpoint and skips ISBNs that were already handled.
+    Lookups that failed transiently are not checkpointed, so they are retried
+    on the next run. The job stops early when the fetcher's circuit opens.
+
+    Lookups run without the library lock; each batch's updates are applied
+    under `library.lock`, so readers and savers in other threads never see a
+    half-applied batch.
+    """
+    def __init__(
+        self,
+        library: Library,
+        fetcher: OpenLibraryFetcher,
+        workers: int = 4,
+        batch_size: int = 50,
+        checkpoint_path: str | None = None,
+        on_batch: Callable[[Library], None] | None = None,
+        on_progress: Callable[[EnrichmentProgress], None] | None = None,
+    ):
+        if workers < 1 or batch_size < 1:
+            raise ValueError("workers and batch_size must be positive")
+        self.library = library
+        self.fetcher = fetcher
+        self.workers = workers
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.on_batch = on_batch
+        self.on_progress = on_progress
+        self.progress = EnrichmentProgress()
+        self._stop = threading.Event()
+
+    def cancel(self) -> None:
+        """Asks the job to stop after the current batch."""
+        self._stop.set()
+
+    def run(self) -> EnrichmentProgress:
+        """Runs the job to the end; an unexpected error ends it in state "failed" instead of raising."""
+        try:
+            self._run()
+        except Exception as exc:
+            self.progress.state = "failed"
+            self.progress.error = f"{exc.__class__.__name__}: {exc}"
+        finally:
+            # Örn. KeyboardInterrupt: iş "running" durumunda takılı kalmasın
+            if self.progress.state in ("pending", "running"):
+                self.progress.state = "cancelled"
+            self.progress.finished_at = time.monotonic()
+        return self.progress
+
+    def _run(self) -> None:
+        done = self._load_checkpoint()
+        already_done = frozenset(done)
+        for isbn in self.library.isbns():
+            if not isbn or not isbn.strip():
+                self.progress.skipped += 1
+            elif isbn not in already_done:
+                self.progress.total += 1
+        self.progress.state = "running"
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for batch in self._batches(already_done):
+                if self._stop.is_set():
+                    self.progress.state = "cancelled"
+                    break
+                results = list(pool.map(lambda b: self.fetcher.fetch(b.isbn), batch))
+                circuit_open = self._apply_batch(batch, results, done)
+                if self.on_batch:
+                    self.on_batch(self.library)
+                self._save_checkpoint(done)
+                if self.on_progress:
+                    self.on_progress(self.progress)
+                if circuit_open:
+                    self.progress.state = "interrupted"
+                    break
+
+        if self.progress.state == "running":
+            self.progress.state = "completed"
+            self._clear_checkpoint()
+
+    def _batches(self, skip: frozenset[str]):
+        """Yields the books to refresh, `batch_size` at a time, loading them only when their batch is due."""
+        batch = []
+        for book in self.library.iter_books(chunk_size=self.batch_size):
+            if not book.isbn or not book.isbn.strip() or book.isbn in skip:
+                continue
+            batch.append(book)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _apply_batch(self, batch: list[Book], results: list[FetchResult], done: set[str]) -> bool:
+        with self.library.lock:
+            return self._apply_results(batch, results, done)
+
+    def _apply_results(self, batch: list[Book], results: list[FetchResult], done: set[str]) -> bool:
+        circuit_open = False
+        for book, result in zip(batch, results):
+            self.progress.processed += 1
+            if result.ok:
+                title, authors = result.details
+                if book.title != title or book.author != authors:
+                    self.library.update_book_details(book, title, authors)
+                    self.progress.updated += 1
+                else:
+                    self.progress.unchanged += 1
+            elif result.status is FetchStatus.NOT_FOUND:
+                self.progress.not_found += 1
+            else:
+                self.progress.failed += 1
+                if result.status is FetchStatus.CIRCUIT_OPEN:
+                    circuit_open = True
+                continue
+            done.add(book.isbn)
+        return circuit_open
+
+    # --- Checkpoint helpers ---
+    def _load_checkpoint(self) -> set[str]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return set()
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return set(json.load(f).get("done", []))
+        except Exception:
+            return set()
+
+    def _save_checkpoint(self, done: set[str]) -> None:
+        if not self.checkpoint_path:
+            return
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(done)}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _clear_checkpoint(self) -> None:
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Refresh book metadata from Open Library.")
+    parser.add_argument("data_file", nargs="?", default="library_data.json")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--checkpoint", default=None, help="defaults to <data_file>.enrich.json")
+    args = parser.parse_args()
+
+    lib = Library.load_from_file(args.data_file)
+    job = EnrichmentJob(
+        lib,
+        OpenLibraryFetcher(),
+        workers=args.workers,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint or f"{args.data_file}.enrich.json",
+        on_batch=lambda l: l.save_to_file(args.data_file),
+        on_progress=print_progress,
+    )
+    try:
+        progress = job.run()
+    except KeyboardInterrupt:
+        print("\nİptal edildi; kaldığı yerden devam etmek için tekrar çalıştırın.")
+        return
+    print(f"\nBitti ({progress.state}): {progress.updated} güncellendi, "
+          f"{progress.not_found} bulunamadı, {progress.failed} hata.")
+    if progress.error:
+        print(f"Hata: {progress.error}")
+
+
+def print_progress(progress: EnrichmentProgress) -> None:
+    print(f"\r{progress.processed}/{progress.total} işlendi, "
+          f"{progress.updated} güncellendi, {progress.failed} hata "
+          f"({progress.throughput:.1f} kitap/sn)", end="", flush=True)
+
+
+if __name__ == "__main__":
+    main()
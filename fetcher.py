@@ -0,0 +1,282 @@
+"""
+Open Library fetch layer: typed outcomes, rate limiting, retries and a circuit breaker.
+"""
+
+from dataclasses import dataclass
+from enum import Enum
+import os
+import random
+import threading
+import time
+
+import requests
+
+from library import parse_open_library_payload
+
+OPEN_LIBRARY_URL = "https://openlibrary.org/api/books"
+
+
+class FetchStatus(str, Enum):
+    """Outcome of a single ISBN lookup."""
+    FOUND = "found"
+    NOT_FOUND = "not_found"
+    INVALID_ISBN = "invalid_isbn"
+    RATE_LIMITED = "rate_limited"
+    UPSTREAM_ERROR = "upstream_error"
+    CIRCUIT_OPEN = "circuit_open"
+
+
+@dataclass
+class FetchResult:
+    """Result of a lookup; `details` is (title, authors) only when status is FOUND."""
+    status: FetchStatus
+    details: tuple[str, str] | None = None
+    error: str | None = None
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.status is FetchStatus.FOUND
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `rate` tokens are refilled per second up to `capacity`."""
+    def __init__(self, rate: float, capacity: int, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Blocks until a token is available; returns False if `timeout` expires first."""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            self._sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and fails fast for `reset_timeout` seconds.
+
+    After the timeout a single trial call is let through (half-open); its outcome
+    closes or re-opens the circuit.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Frees the half-open trial slot when a call ended without a verdict on upstream health."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class _TransientError(Exception):
+    def __init__(self, status: FetchStatus, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class OpenLibraryFetcher:
+    """Looks up books on Open Library without flooding it.
+
+    Every HTTP attempt takes a token from the rate limiter and a slot from the
+    in-flight semaphore. Timeouts, connection errors, 429 and 5xx responses are
+    retried with full-jitter exponential backoff; repeated failures trip the
+    circuit breaker so callers get CIRCUIT_OPEN immediately while upstream is down.
+    """
+    def __init__(
+        self,
+        base_url: str = OPEN_LIBRARY_URL,
+        rate_per_second: float = 5.0,
+        burst: int = 5,
+        max_in_flight: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        timeout: float = 5.0,
+        acquire_timeout: float = 10.0,
+        breaker: CircuitBreaker | None = None,
+        sleep=time.sleep,
+    ):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._sleep = sleep
+
+    @classmethod
+    def from_env(cls) -> 'OpenLibraryFetcher':
+        """Builds a fetcher from OPEN_LIBRARY_* environment variables (e.g. for load tests)."""
+        env = os.environ
+        return cls(
+            base_url=env.get("OPEN_LIBRARY_URL", OPEN_LIBRARY_URL),
+            rate_per_second=float(env.get("OPEN_LIBRARY_RATE", 5.0)),
+            burst=int(env.get("OPEN_LIBRARY_BURST", 5)),
+            max_in_flight=int(env.get("OPEN_LIBRARY_MAX_IN_FLIGHT", 4)),
+            timeout=float(env.get("OPEN_LIBRARY_TIMEOUT", 5.0)),
+        )
+
+    def fetch(self, isbn: str) -> FetchResult:
+        isbn = (isbn or "").strip()
+        if not isbn:
+            return FetchResult(FetchStatus.INVALID_ISBN, error="ISBN cannot be empty")
+
+        attempts = 0
+        last: _TransientError | None = None
+        while attempts <= self.max_retries:
+            # Önce token: yarı açık devrenin deneme hakkı, beklerken zaman aşımına uğrayabilecek bir çağrıya verilmesin
+            if not self.bucket.acquire(timeout=self.acquire_timeout):
+                return FetchResult(FetchStatus.RATE_LIMITED, error="Local rate limit exceeded", attempts=attempts)
+            if not self.breaker.allow_request():
+                return FetchResult(FetchStatus.CIRCUIT_OPEN, error="Open Library circuit is open", attempts=attempts)
+
+            attempts += 1
+            recorded = False
+            try:
+                with self._slots:
+                    details = self._request(isbn)
+                self.breaker.record_success()
+                recorded = True
+            except _TransientError as exc:
+                self.breaker.record_failure()
+                recorded = True
+                last = exc
+                if attempts > self.max_retries:
+                    break
+                self._sleep(self._backoff(attempts, exc.retry_after))
+                continue
+            finally:
+                if not recorded:
+                    self.breaker.release_trial()
+
+            if details is None:
+                return FetchResult(FetchStatus.NOT_FOUND, attempts=attempts)
+            return FetchResult(FetchStatus.FOUND, details=details, attempts=attempts)
+
+        return FetchResult(last.status, error=str(last), attempts=attempts)
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def _request(self, isbn: str) -> tuple[str, str] | None:
+        params = {"bibkeys": f"ISBN:{isbn}", "format": "json", "jscmd": "data"}
+        try:
+            response = requests.get(self.base_url, params=params, timeout=self.timeout)
+        except requests.RequestException as exc:
+            raise _TransientError(FetchStatus.UPSTREAM_ERROR, f"Request failed: {exc.__class__.__name__}")
+
+        if response.status_code == 429:
+            raise _TransientError(
+                FetchStatus.RATE_LIMITED,
+                "Open Library rate limit exceeded",
+                retry_after=_parse_retry_after(response.headers.get("Retry-After")),
+            )
+        if response.status_code >= 500:
+            raise _TransientError(FetchStatus.UPSTREAM_ERROR, f"Open Library returned {response.status_code}")
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 400:
+            # Diğer 4xx hataları tekrar denemeyle düzelmez
+            return None
+
+        try:
+            payload = response.json()
+        except ValueError:
+            raise _TransientError(FetchStatus.UPSTREAM_ERROR, "Open Library returned invalid JSON")
+        try:
+            return parse_open_library_payload(payload, isbn)
+        except (AttributeError, TypeError, KeyError, ValueError):
+            raise _TransientError(FetchStatus.UPSTREAM_ERROR, "Open Library returned an unexpected payload")
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
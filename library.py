@@ -3,12 +3,24 @@ Python ile Nesne Yönelimli Programlama (OOP): Kütüphane Sistemi
 Bu dosya, OOP notebook'undaki tüm kod örneklerini içerir.
 """
 
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import List
-from pydantic import BaseModel, Field, ValidationError
+from typing import List, Literal
+from typing_extensions import NotRequired, TypedDict
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 import requests
+import gc
 import json
 import os
+import re
+import tempfile
+import threading
+import weakref
+import zlib
+
+from search import FuzzyIndex
+from spill import ResidencyStats, SpillStore
 
 
 class Book:
@@ -18,11 +30,15 @@ class Book:
         self.author = author
         self.isbn = isbn
         self.is_borrowed = False
+        # Kitabı içeren kütüphane; durum değişikliklerini ona bildiririz
+        self._library = None
+        self._slot = None
 
     def borrow_book(self):
         """Marks the book as borrowed."""
         if not self.is_borrowed:
             self.is_borrowed = True
+            self._touch()
         else:
             # Raise an error if already borrowed for clear feedback
             raise ValueError(f"'{self.title}' is already borrowed.")
@@ -31,9 +47,15 @@ class Book:
         """Marks the book as returned."""
         if self.is_borrowed:
             self.is_borrowed = False
+            self._touch()
         else:
             raise ValueError(f"'{self.title}' was not borrowed.")
 
+    def _touch(self):
+        """Tells the owning library that this book needs to be saved again."""
+        if self._library is not None:
+            self._library._mark_book_dirty(self)
+
     def display_info(self) -> str:
         return f"'{self.title}' by {self.author}"
 
@@ -59,76 +81,564 @@ class AudioBook(Book):
 
 
 class Library:
-    """Manages a collection of books using composition."""
-    def __init__(self, name: str):
+    """Manages a collection of books using composition.
+
+    The library tracks whether it changed since it was last loaded or saved,
+    so `save_to_file` is a no-op for an unchanged library. It also tracks which
+    segments changed (books are assigned to one of `segment_count` segments by
+    ISBN hash), so `save_to_directory` rewrites only the modified segments.
+
+    With `max_resident_books`, only that many Book objects stay in memory; the
+    least recently used ones are spilled to a `SpillStore` and loaded back on
+    access. Lookups by ISBN, search results and `list_books` see spilled books
+    transparently. `list_books` and saves read cold books without pulling them
+    into the working set. There is never more than one live Book object per
+    book: a spilled book that is still referenced somewhere is handed out
+    again instead of being rebuilt, and changes to it are written straight
+    back to the store.
+
+    Mutations, searches and saves take `lock` (reentrant), so the library can
+    be shared between request handlers and background jobs. Callers hold it
+    themselves for compound operations such as check-then-add or add-then-save.
+    """
+    segment_count = 64
+
+    def __init__(self, name: str, max_resident_books: int | None = None, spill_path: str | None = None):
         self.name = name
-        # Encapsulation: Bu liste sınıfın iç detayıdır.
-        self._books = []
+        # Encapsulation: Kitaplar dahili "slot" numaralarıyla tutulur; ekleme sırası korunur.
+        self._slot_isbn = {}
+        # ISBN -> ilk slot; aynı ISBN'li sonraki kopyalar (nadir) ayrı tutulur
+        self._by_isbn = {}
+        self._isbn_duplicates = {}
+        self._resident = OrderedDict()
+        # Yüklenmiş ama henüz Book nesnesine çevrilmemiş kayıtlar; ilk erişimde kurulur
+        self._unbuilt = {}
+        self._next_slot = 0
+        # Bellek bütçesi: sığmayan kitaplar diske taşınır
+        self.max_resident_books = None
+        self._store = None
+        self._modified = set()
+        # Diskteki ama hâlâ bir yerde kullanılan kitap nesneleri; yeniden kurulmaz, aynı nesne verilir
+        self._spilled_copies = weakref.WeakValueDictionary()
+        self.residency = ResidencyStats()
+        # Değişiklikleri, aramaları ve kayıtları sıraya koyar (API iş parçacıkları + arka plan işleri)
+        self.lock = threading.RLock()
+        # Arama indeksi ilk aramada (veya arka planda) kurulur; yükleme hızını etkilemesin
+        self._search_index = None
+        # Kurulum sürerken değişen slotlar; kurulum bitince indekse yeniden uygulanır
+        self._index_changes = None
+        self._index_build_lock = threading.Lock()
+        self._dirty = False
+        self._dirty_segments = set()
+        # Son kaydedilen/yüklenen hedef; başka bir hedefe kayıt her zaman tam yazımdır
+        self._synced_target = None
+        self._synced_segment_count = None
+        # Son load_from_file / load_from_directory çağrısının raporu
+        self.load_report = None
+        if max_resident_books is not None:
+            self.set_memory_budget(max_resident_books, spill_path=spill_path)
 
     def add_book(self, book: 'Book'):
-        self._books.append(book)
+        with self.lock:
+            slot = self._attach(book)
+            self._index_changed(book, slot)
+            self._mark_book_dirty(book)
+            self._enforce_budget()
 
     def find_book(self, title: str) -> 'Book | None':
-        for book in self._books:
+        for book in self.iter_books():
             if book.title.lower() == title.lower():
                 return book
         return None
 
     def find_book_by_isbn(self, isbn: str) -> 'Book | None':
-        for book in self._books:
-            if book.isbn == isbn:
-                return book
-        return None
+        with self.lock:
+            slot = self._by_isbn.get(isbn)
+            if slot is None:
+                return None
+            return self._get(slot)
 
     def remove_book_by_isbn(self, isbn: str) -> bool:
-        target = self.find_book_by_isbn(isbn)
-        if target is None:
-            return False
-        self._books.remove(target)
-        return True
+        with self.lock:
+            slot = self._by_isbn.get(isbn)
+            if slot is None:
+                return False
+            duplicates = self._isbn_duplicates.get(isbn)
+            if duplicates:
+                self._by_isbn[isbn] = duplicates.pop(0)
+                if not duplicates:
+                    del self._isbn_duplicates[isbn]
+            else:
+                del self._by_isbn[isbn]
+            target = self._get(slot, promote=False)
+            del self._slot_isbn[slot]
+            self._resident.pop(slot, None)
+            self._spilled_copies.pop(slot, None)
+            self._modified.discard(slot)
+            if self._store is not None:
+                self._store.delete(slot)
+            self._index_changed(target, slot, removed=True)
+            target._library = None
+            self._mark_book_dirty(target)
+            return True
+
+    def update_book_details(self, book: 'Book', title: str, author: str) -> None:
+        """Changes a book's title/author and keeps the search index in sync.
+
+        Does nothing if the book was removed meanwhile (e.g. while a background
+        lookup for it was running).
+        """
+        with self.lock:
+            if book._library is not self or book._slot not in self._slot_isbn:
+                return
+            if book.title == title and book.author == author:
+                return
+            book.title = title
+            book.author = author
+            self._index_changed(book, book._slot)
+            self._mark_book_dirty(book)
+
+    def search_books(self, query: str, limit: int = 10, field: str = "any") -> list['Book']:
+        """Typo-tolerant search over titles and/or authors; best matches first.
+
+        Builds the search index first if `build_search_index` has not run yet.
+        """
+        if self._search_index is None:
+            self.build_search_index()
+        with self.lock:
+            return [book for book, _ in self._search_index.search(query, limit=limit, field=field)]
+
+    def build_search_index(self) -> None:
+        """Builds the fuzzy search index if it does not exist yet, e.g. from a background thread.
+
+        Books are indexed without holding `lock`, so the library stays usable
+        meanwhile; changes made during the build are applied before the index
+        is installed. Concurrent callers wait for the running build. Must not be
+        called while holding `lock`.
+        """
+        with self._index_build_lock:
+            if self._search_index is not None:
+                return
+            with self.lock:
+                self._index_changes = set()
+            index = FuzzyIndex(resolve=self._get)
+            for book in self.iter_books():
+                index.add(book, key=book._slot)
+            with self.lock:
+                for slot in self._index_changes:
+                    if slot in self._slot_isbn:
+                        index.update(self._get(slot, promote=False), key=slot)
+                    else:
+                        index.remove(None, key=slot)
+                self._index_changes = None
+                self._search_index = index
+
+    def _index_changed(self, book: 'Book', slot: int, removed: bool = False) -> None:
+        if self._search_index is not None:
+            if removed:
+                self._search_index.remove(book, key=slot)
+            else:
+                self._search_index.update(book, key=slot)
+        elif self._index_changes is not None:
+            self._index_changes.add(slot)
 
     def list_books(self) -> list['Book']:
-        return list(self._books)
+        return list(self.iter_books())
+
+    def iter_books(self, chunk_size: int = 512):
+        """Yields every book in insertion order without changing the working set.
+
+        Spilled books are read `chunk_size` at a time, so walking a large
+        library only holds one chunk of them in memory.
+        """
+        for chunk in self._chunks(chunk_size, build=True):
+            for _, book, _ in chunk:
+                yield book
+
+    def isbns(self) -> list[str]:
+        """ISBNs of all books in insertion order, without loading any book."""
+        with self.lock:
+            return list(self._slot_isbn.values())
 
     @property
     def total_books(self) -> int:
-        return len(self._books)
+        return len(self._slot_isbn)
+
+    @property
+    def resident_books(self) -> int:
+        return len(self._resident) + len(self._unbuilt)
+
+    @property
+    def is_dirty(self) -> bool:
+        """True if there are changes that have not been saved yet."""
+        return self._dirty
+
+    # --- Memory budget ---
+    def set_memory_budget(self, max_resident_books: int | None, spill_path: str | None = None) -> None:
+        """Limits how many Book objects stay in memory; None loads everything back and drops the spill store."""
+        with self.lock:
+            if max_resident_books is None:
+                if self._store is not None:
+                    books = list(self.iter_books())
+                    self._resident = OrderedDict((book._slot, book) for book in books)
+                    self._store.close()
+                    self._store = None
+                    self._modified.clear()
+                    self._spilled_copies.clear()
+                self.max_resident_books = None
+                return
+            if max_resident_books < 1:
+                raise ValueError("max_resident_books must be positive")
+            if self._store is None:
+                for slot in list(self._unbuilt):
+                    self._build_unbuilt(slot)
+                self._store = SpillStore(spill_path)
+                # Bellekteki hiçbir kitabın diskte kopyası yok
+                self._modified = set(self._resident)
+            self.max_resident_books = max_resident_books
+            self._enforce_budget()
+
+    def memory_stats(self) -> dict:
+        """Residency and spill statistics, e.g. for sizing API workers."""
+        stats = {
+            "total_books": self.total_books,
+            "resident_books": self.resident_books,
+            "spilled_books": self.total_books - self.resident_books,
+            "max_resident_books": self.max_resident_books,
+            "spill_bytes": self._store.size_bytes() if self._store is not None else 0,
+        }
+        stats.update(self.residency.to_dict())
+        return stats
+
+    def close(self) -> None:
+        """Closes and deletes the spill store; spilled books are unavailable afterwards.
+
+        Books keep a back-reference to their library, so an unused library is
+        only freed by the cyclic GC; call this instead of relying on it.
+        """
+        with self.lock:
+            if self._store is not None:
+                self._store.close()
+
+    def _attach(self, book: 'Book') -> int:
+        slot = self._next_slot
+        self._next_slot += 1
+        book._library = self
+        book._slot = slot
+        self._slot_isbn[slot] = book.isbn
+        self._index_isbn(book.isbn, slot)
+        self._resident[slot] = book
+        if self._store is not None:
+            self._modified.add(slot)
+        return slot
+
+    def _index_isbn(self, isbn: str, slot: int) -> None:
+        if isbn in self._by_isbn:
+            self._isbn_duplicates.setdefault(isbn, []).append(slot)
+        else:
+            self._by_isbn[isbn] = slot
+
+    def _get(self, slot: int, promote: bool = True) -> 'Book':
+        with self.lock:
+            book = self._resident.get(slot)
+            if book is not None:
+                if promote:
+                    self._resident.move_to_end(slot)
+                    self.residency.hits += 1
+                return book
+            book = self._build_unbuilt(slot)
+            if book is not None:
+                return book
+            book = self._spilled_copy(slot)
+            if promote:
+                self.residency.misses += 1
+                self._spilled_copies.pop(slot, None)
+                self._resident[slot] = book
+                self._enforce_budget()
+            return book
+
+    def _spilled_copy(self, slot: int, record: dict | None = None) -> 'Book':
+        """The live object of a spilled book, built from its stored record only if none exists."""
+        book = self._spilled_copies.get(slot)
+        if book is None:
+            book = self._revive(slot, record if record is not None else self._store.get(slot))
+            self._spilled_copies[slot] = book
+        return book
+
+    def _revive(self, slot: int, record: dict) -> 'Book':
+        book = _build_book(record)
+        book._library = self
+        book._slot = slot
+        return book
+
+
+    def _iter_records(self, chunk_size: int = 512):
+        """Yields serialized books in insertion order; spilled ones come straight from the store."""
+        for chunk in self._chunks(chunk_size):
+            for _, book, record in chunk:
+                yield self._serialize_book(book) if book is not None else record
+
+    def _chunks(self, chunk_size: int, build: bool = False):
+        """Batches of (slot, resident book or None, stored record or None); one store query per batch.
+
+        With `build`, spilled books are returned as their live Book object instead of a record.
+        """
+        with self.lock:
+            slots = list(self._slot_isbn)
+        for start in range(0, len(slots), chunk_size):
+            with self.lock:
+                chunk = [(slot, self._resident.get(slot) or self._build_unbuilt(slot))
+                         for slot in slots[start:start + chunk_size] if slot in self._slot_isbn]
+                if build:
+                    chunk = [(slot, book or self._spilled_copies.get(slot)) for slot, book in chunk]
+                missing = [slot for slot, book in chunk if book is None]
+                records = self._store.get_many(missing) if missing else {}
+                if build:
+                    chunk = [(slot, book or self._spilled_copy(slot, records[slot])) for slot, book in chunk]
+                    records = {}
+            yield [(slot, book, records.get(slot)) for slot, book in chunk]
+
+    def _build_unbuilt(self, slot: int) -> 'Book | None':
+        """Turns a loaded record into the canonical Book object, if it was not built yet."""
+        record = self._unbuilt.pop(slot, None)
+        if record is None:
+            return None
+        book = self._resident[slot] = self._revive(slot, record)
+        return book
+
+    def _enforce_budget(self) -> None:
+        with self.lock:
+            if self._store is None or len(self._resident) <= self.max_resident_books:
+                return
+            # Yalnızca diskteki kopyası eskimiş kitaplar yazılır; hepsi tek işlemde
+            pending = []
+            while len(self._resident) > self.max_resident_books:
+                slot, book = self._resident.popitem(last=False)
+                if slot in self._modified:
+                    pending.append((slot, self._serialize_book(book)))
+                    self._modified.discard(slot)
+                # Nesneyi hâlâ tutan biri varsa sonraki erişimler aynı nesneyi alır
+                self._spilled_copies[slot] = book
+                self.residency.evictions += 1
+            self._store.put_many(pending)
+            self.residency.spill_writes += len(pending)
+
+    def _mark_book_dirty(self, book: 'Book') -> None:
+        with self.lock:
+            self._dirty = True
+            self._dirty_segments.add(self._segment_of(book.isbn))
+            if self._store is None:
+                return
+            slot = book._slot
+            if self._resident.get(slot) is book:
+                self._modified.add(slot)
+            elif slot in self._slot_isbn:
+                # Diskteki kitabın tek canlı nesnesi değişti; hemen geri yaz
+                self._store.put(slot, self._serialize_book(book))
+                self.residency.spill_writes += 1
+
+    def _mark_clean(self, target: str) -> None:
+        self._dirty = False
+        self._dirty_segments.clear()
+        self._synced_target = target
+
+    def _segment_of(self, isbn: str) -> int:
+        return zlib.crc32(isbn.encode("utf-8")) % self.segment_count
 
     # --- Persistence helpers ---
     def to_dict(self) -> dict:
         return {
             "name": self.name,
-            "books": [self._serialize_book(b) for b in self._books],
+            "books": list(self._iter_records()),
         }
 
     @classmethod
-    def from_dict(cls, data: dict) -> 'Library':
+    def from_dict(cls, data: dict, report: 'LoadReport | None' = None) -> 'Library':
+        """Builds a library from a dict; invalid book records are skipped (and listed in `report`)."""
+        report = report if report is not None else LoadReport()
         name = data.get("name", "Library")
+        if not isinstance(name, str):
+            report.add_error(None, "name: Input should be a valid string")
+            name = "Library"
+        books = data.get("books", [])
+        if not isinstance(books, list):
+            report.file_error = "books: Input should be a valid list"
+            books = []
         lib = cls(name=name)
-        for b in data.get("books", []):
-            book = cls._deserialize_book(b)
-            if book:
-                lib.add_book(book)
+        lib._add_records(_validate_records(books, report))
         return lib
 
+    def _add_records(self, records: list[dict], chunk_size: int = 1000) -> None:
+        """Bulk-adds validated records to a freshly created library (no search index yet).
+
+        Slots and indexes are filled with whole-list operations rather than one
+        `_attach` call per book; this is the hot path of every load. Without a
+        memory budget the records are kept as they are and only become Book
+        objects on first access.
+        """
+        start = self._next_slot
+        slots = range(start, start + len(records))
+        self._next_slot += len(records)
+        isbns = [record["isbn"] for record in records]
+        self._slot_isbn.update(zip(slots, isbns))
+        # Tekrarsız ISBN'ler (olağan durum) tek bir sözlük işlemiyle indekslenir
+        first = dict(zip(isbns, slots))
+        if len(first) == len(isbns) and not self._by_isbn:
+            self._by_isbn = first
+        elif len(first) == len(isbns) and self._by_isbn.keys().isdisjoint(first):
+            self._by_isbn.update(first)
+        else:
+            for isbn, slot in zip(isbns, slots):
+                self._index_isbn(isbn, slot)
+
+        if records:
+            # Henüz hiçbir hedefe senkron değil; ilk kayıt zaten tam yazım olur
+            self._dirty = True
+        if self._store is None:
+            # Book nesneleri ilk erişimde kurulur; yükleme yalnızca çözümleme ve indekslemeden ibaret
+            self._unbuilt.update(zip(slots, records))
+            return
+
+        # Yalnızca son `max_resident_books` kayıt bellekte kalır; öncekiler doğrudan diske yazılır
+        cold = max(0, len(records) - self.max_resident_books)
+        for offset in range(0, cold, chunk_size):
+            end = min(offset + chunk_size, cold)
+            pending = [(slots[i], self._serialize_book(_build_book(records[i]))) for i in range(offset, end)]
+            self._store.put_many(pending)
+            self.residency.spill_writes += len(pending)
+
+        books = [_build_book(record) for record in records[cold:]]
+        hot = slots[cold:]
+        for book, slot in zip(books, hot):
+            book._library = self
+            book._slot = slot
+        self._resident.update(zip(hot, books))
+        self._modified.update(hot)
+        self._enforce_budget()
+
     def save_to_file(self, file_path: str) -> None:
-        try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
-        except Exception:
-            # Sessizce geç; CLI kullanıcı deneyimini bozma
-            pass
+        """Writes the whole library to `file_path`; does nothing if it is unchanged since the last save."""
+        with self.lock:
+            target = os.path.abspath(file_path)
+            if not self._dirty and self._synced_target == target:
+                return
+            try:
+                _atomic_write_json(file_path, self.to_dict(), indent=2)
+            except Exception:
+                # Sessizce geç; CLI kullanıcı deneyimini bozma
+                return
+            self._mark_clean(target)
 
     @classmethod
-    def load_from_file(cls, file_path: str, default_name: str = "Library") -> 'Library':
+    def load_from_file(cls, file_path: str, default_name: str = "Library",
+                       quarantine: bool = True, max_resident_books: int | None = None) -> 'Library':
+        """Loads a library saved with `save_to_file`.
+
+        Records that fail validation are skipped instead of discarding the whole
+        file; see `load_with_report` for the details, which are also kept in
+        `library.load_report`.
+        """
+        lib, _ = cls.load_with_report(file_path, default_name=default_name, quarantine=quarantine,
+                                      max_resident_books=max_resident_books)
+        return lib
+
+    @classmethod
+    def load_with_report(cls, file_path: str, default_name: str = "Library", quarantine: bool = False,
+                         max_resident_books: int | None = None) -> 'tuple[Library, LoadReport]':
+        """Loads and validates a library file in one pass, returning it with a `LoadReport`.
+
+        The common case (a valid file) is decoded and validated by pydantic in a
+        single `validate_json` call. Only when that fails are the records looked
+        at one by one, so every bad record is reported with its index. If the
+        file is not even valid JSON, each book object is salvaged on its own. With
+        `quarantine=True`, rejected records are written to
+        `<file_path>.quarantine.json`, and a corrupt file is also copied to
+        `<file_path>.corrupt` so a later save cannot destroy the original data.
+        """
+        report = LoadReport(path=file_path)
         if not os.path.exists(file_path):
-            return cls(name=default_name)
+            lib = cls(name=default_name, max_resident_books=max_resident_books)
+            lib.load_report = report
+            return lib, report
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return cls.from_dict(data)
-        except Exception:
-            return cls(name=default_name)
+            with open(file_path, "rb") as f:
+                raw = f.read()
+        except OSError as e:
+            report.file_error = str(e)
+            lib = cls(name=default_name, max_resident_books=max_resident_books)
+            lib.load_report = report
+            return lib, report
+
+        with _gc_paused():
+            name, records = _decode_library_json(raw, report)
+            lib = cls(name=name or default_name, max_resident_books=max_resident_books)
+            lib._add_records(records)
+        if quarantine and (report.errors or report.file_error):
+            _quarantine(file_path, raw, report)
+        lib._mark_clean(os.path.abspath(file_path))
+        lib.load_report = report
+        return lib, report
+
+    def save_to_directory(self, dir_path: str) -> int:
+        """Saves the library as segment files plus a manifest and returns how many segments were written.
+
+        Only segments changed since the last save/load of the same directory are
+        rewritten; each file is replaced atomically and the manifest goes last.
+        """
+        with self.lock:
+            target = os.path.abspath(dir_path) + os.sep
+            if not self._dirty and self._synced_target == target and self._synced_segment_count == self.segment_count:
+                return 0
+            full = self._synced_target != target or self._synced_segment_count != self.segment_count
+            segments = range(self.segment_count) if full else sorted(self._dirty_segments)
+
+            grouped = {i: [] for i in segments}
+            for record in self._iter_records():
+                index = self._segment_of(record["isbn"])
+                if index in grouped:
+                    grouped[index].append(record)
+
+            os.makedirs(dir_path, exist_ok=True)
+            for index, books in grouped.items():
+                _atomic_write_json(_segment_path(dir_path, index), {"segment": index, "books": books})
+            manifest = {"name": self.name, "segment_count": self.segment_count, "version": 1}
+            _atomic_write_json(os.path.join(dir_path, "manifest.json"), manifest, indent=2)
+            if full:
+                # Eski, daha büyük bir segment sayısından kalan dosyaları temizle
+                for file_name in os.listdir(dir_path):
+                    index = _segment_index(file_name)
+                    if index is not None and index >= self.segment_count:
+                        os.remove(os.path.join(dir_path, file_name))
+            self._mark_clean(target)
+            self._synced_segment_count = self.segment_count
+            return len(grouped)
+
+    @classmethod
+    def load_from_directory(cls, dir_path: str, default_name: str = "Library",
+                            max_resident_books: int | None = None) -> 'Library':
+        manifest_path = os.path.join(dir_path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return cls(name=default_name, max_resident_books=max_resident_books)
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        lib = cls(name=manifest.get("name", default_name), max_resident_books=max_resident_books)
+        lib.segment_count = int(manifest.get("segment_count", cls.segment_count))
+        report = LoadReport(path=dir_path)
+        for index in range(lib.segment_count):
+            path = _segment_path(dir_path, index)
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                segment_report = LoadReport(path=path)
+                raw = f.read()
+            with _gc_paused():
+                _, records = _decode_library_json(raw, segment_report)
+                lib._add_records(records)
+            report.merge(segment_report)
+        lib._mark_clean(os.path.abspath(dir_path) + os.sep)
+        lib._synced_segment_count = lib.segment_count
+        lib.load_report = report
+        return lib
 
     @staticmethod
     def _serialize_book(book: 'Book') -> dict:
@@ -146,26 +656,219 @@ class Library:
             base["duration"] = getattr(book, "duration", 0)
         return base
 
-    @staticmethod
-    def _deserialize_book(data: dict) -> 'Book | None':
+
+class _BookRecord(TypedDict):
+    """Schema of one serialized book; TypedDict validates to plain dicts, which is much faster than models."""
+    kind: NotRequired[Literal["Book", "EBook", "AudioBook"]]
+    title: str
+    author: str
+    isbn: str
+    is_borrowed: NotRequired[bool]
+    file_format: NotRequired[str]
+    duration: NotRequired[int]
+
+
+class _LibraryRecord(TypedDict):
+    name: NotRequired[str]
+    books: NotRequired[List[_BookRecord]]
+
+
+# Şema bir kez derlenir; her yüklemede yeniden kullanılır
+_LIBRARY_ADAPTER = TypeAdapter(_LibraryRecord)
+_BOOK_ADAPTER = TypeAdapter(_BookRecord)
+
+# Kitap kayıtları iç içe nesne içermez; bozuk bir dosyada her biri ayrı ayrı kurtarılabilir
+_FLAT_OBJECT = re.compile(rb"\{[^{}]*\}")
+_NAME_FIELD = re.compile(rb'"name"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+@dataclass
+class RecordError:
+    """A book record that failed validation; `index` is its position in the file (None for file-level fields)."""
+    index: int | None
+    message: str
+    record: object = None
+
+
+@dataclass
+class LoadReport:
+    """Outcome of loading a library file."""
+    path: str | None = None
+    loaded: int = 0
+    errors: List[RecordError] = field(default_factory=list)
+    file_error: str | None = None
+    salvaged: bool = False
+    quarantine_path: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and self.file_error is None
+
+    def add_error(self, index: int | None, message: str, record: object = None) -> None:
+        self.errors.append(RecordError(index=index, message=message, record=record))
+
+    def merge(self, other: 'LoadReport') -> None:
+        self.loaded += other.loaded
+        self.errors.extend(other.errors)
+        self.salvaged = self.salvaged or other.salvaged
+        if other.file_error and not self.file_error:
+            self.file_error = f"{other.path}: {other.file_error}"
+
+
+def _format_errors(errors: list[dict]) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'record'}: {e['msg']}" for e in errors
+    )
+
+
+def _decode_library_json(raw: bytes, report: LoadReport) -> tuple[str | None, list[dict]]:
+    """Decodes and validates a library/segment file, collecting per-record errors in `report`."""
+    try:
+        data = _LIBRARY_ADAPTER.validate_json(raw)
+    except ValidationError as e:
+        errors = e.errors()
+    else:
+        books = data.get("books", [])
+        report.loaded += len(books)
+        return data.get("name"), books
+
+    if any(err["type"] == "json_invalid" for err in errors):
+        report.file_error = "File is not valid JSON; salvaged intact book records"
+        report.salvaged = True
+        return _salvage(raw, report)
+
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        report.file_error = "Top-level value must be an object"
+        return None, []
+    name = data.get("name")
+    if not isinstance(name, str):
+        if "name" in data:
+            report.add_error(None, "name: Input should be a valid string")
+        name = None
+    books = data.get("books", [])
+    if not isinstance(books, list):
+        report.file_error = "books: Input should be a valid list"
+        return name, []
+
+    # İlk geçişin hatalarından bozuk kayıtların indekslerini çıkar; gerisi zaten geçerli
+    by_index: dict[int, list[dict]] = {}
+    for err in errors:
+        loc = err["loc"]
+        if len(loc) >= 2 and loc[0] == "books" and isinstance(loc[1], int):
+            by_index.setdefault(loc[1], []).append({**err, "loc": loc[2:]})
+    for index in sorted(by_index):
+        report.add_error(index, _format_errors(by_index[index]), books[index])
+    good = [b for i, b in enumerate(books) if i not in by_index]
+    records = _validate_records(good, None)
+    report.loaded += len(records)
+    return name, records
+
+
+def _validate_records(books: list, report: LoadReport | None) -> list[dict]:
+    """Validates raw book dicts, skipping (and reporting) the invalid ones."""
+    records = []
+    for index, book in enumerate(books):
         try:
-            kind = data.get("kind", "Book")
-            title = data.get("title", "")
-            author = data.get("author", "")
-            isbn = data.get("isbn", "")
-            is_borrowed = bool(data.get("is_borrowed", False))
-            if kind == "EBook":
-                file_format = data.get("file_format", "")
-                b = EBook(title=title, author=author, isbn=isbn, file_format=file_format)
-            elif kind == "AudioBook":
-                duration = int(data.get("duration", 0))
-                b = AudioBook(title=title, author=author, isbn=isbn, duration_in_minutes=duration)
-            else:
-                b = Book(title=title, author=author, isbn=isbn)
-            b.is_borrowed = is_borrowed
-            return b
-        except Exception:
+            records.append(_BOOK_ADAPTER.validate_python(book))
+        except ValidationError as e:
+            if report is not None:
+                report.add_error(index, _format_errors(e.errors()), book)
+    if report is not None:
+        report.loaded += len(records)
+    return records
+
+
+def _salvage(raw: bytes, report: LoadReport) -> tuple[str | None, list[dict]]:
+    name = None
+    match = _NAME_FIELD.search(raw)
+    if match:
+        try:
+            name = json.loads(match.group(1))
+        except ValueError:
+            name = None
+    records = []
+    for index, chunk in enumerate(_FLAT_OBJECT.finditer(raw)):
+        try:
+            book = json.loads(chunk.group())
+        except ValueError:
+            report.add_error(index, "Invalid JSON", chunk.group().decode("utf-8", "replace"))
+            continue
+        try:
+            records.append(_BOOK_ADAPTER.validate_python(book))
+        except ValidationError as e:
+            report.add_error(index, _format_errors(e.errors()), book)
+    report.loaded += len(records)
+    return name, records
+
+
+def _quarantine(file_path: str, raw: bytes, report: LoadReport) -> None:
+    if report.errors:
+        report.quarantine_path = f"{file_path}.quarantine.json"
+        entries = [{"index": e.index, "error": e.message, "record": e.record} for e in report.errors]
+        _atomic_write_json(report.quarantine_path, {"source": file_path, "records": entries}, indent=2)
+    if report.file_error:
+        with open(f"{file_path}.corrupt", "wb") as f:
+            f.write(raw)
+
+
+def _build_book(record: dict) -> 'Book':
+    kind = record.get("kind", "Book")
+    title, author, isbn = record["title"], record["author"], record["isbn"]
+    if kind == "EBook":
+        book = EBook(title=title, author=author, isbn=isbn, file_format=record.get("file_format", ""))
+    elif kind == "AudioBook":
+        book = AudioBook(title=title, author=author, isbn=isbn, duration_in_minutes=record.get("duration", 0))
+    else:
+        book = Book(title=title, author=author, isbn=isbn)
+    book.is_borrowed = record.get("is_borrowed", False)
+    return book
+
+
+@contextmanager
+def _gc_paused():
+    """Suspends the cyclic GC while a load allocates many long-lived objects.
+
+    Otherwise every few hundred new Book objects trigger a collection that
+    walks all objects allocated so far, roughly doubling the cost of building
+    a large library.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _atomic_write_json(path: str, data: dict, indent: int | None = None) -> None:
+    """Writes JSON to a uniquely named temporary file next to `path` and swaps it in with os.replace."""
+    directory, base = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f"{base}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _segment_path(dir_path: str, index: int) -> str:
+    return os.path.join(dir_path, f"segment-{index:04d}.json")
+
+
+def _segment_index(file_name: str) -> int | None:
+    if file_name.startswith("segment-") and file_name.endswith(".json"):
+        try:
+            return int(file_name[len("segment-"):-len(".json")])
+        except ValueError:
             return None
+    return None
 
 
 @dataclass
@@ -259,6 +962,7 @@ def fetch_book_details_by_isbn(isbn: str) -> tuple[str, str] | None:
 
     Returns a tuple of (title, authors_string) if found; otherwise None.
     It never raises on network or parsing issues; instead returns None.
+    Use `fetcher.OpenLibraryFetcher` to tell "not found" apart from upstream failures.
     """
     if not isbn or not isbn.strip():
         return None
@@ -272,6 +976,11 @@ def fetch_book_details_by_isbn(isbn: str) -> tuple[str, str] | None:
     except Exception:
         return None
 
+    return parse_open_library_payload(payload, isbn)
+
+
+def parse_open_library_payload(payload, isbn: str) -> tuple[str, str] | None:
+    """Extract (title, authors_string) for `isbn` from an Open Library `jscmd=data` response."""
     if not isinstance(payload, dict):
         return None
 
@@ -0,0 +1,371 @@
+"""
+Load-testing harness for api.py.
+
+Starts the API under uvicorn together with a local fake Open Library server,
+drives a mixed read/write workload at a target request rate and reports
+latency percentiles and throughput per endpoint.
+
+    python loadtest.py --rps 200 --duration 30 --mix list=40,get=30,search=10,add=15,delete=5
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+# Bilinen kitap kalmadığında kullanılır; bu ISBN için gelen 404 hata sayılmaz
+NO_BOOK = "0000000000"
+
+DEFAULT_MIX = {"list": 40, "get": 30, "search": 10, "add": 15, "delete": 5}
+
+# Aynı isim altında toplanan endpoint'ler (ISBN'e göre ayrı satır olmasın)
+ENDPOINTS = {
+    "list": "GET /books",
+    "get": "GET /books/{isbn}",
+    "search": "GET /books/search",
+    "add": "POST /books",
+    "delete": "DELETE /books/{isbn}",
+}
+
+SEARCH_TERMS = ["Tolkein", "hobit", "orwell", "dune", "mathilda", "dahl", "herbert", "histroy"]
+
+
+class FakeOpenLibraryServer:
+    """Open Library stand-in answering every ISBN with a synthetic book.
+
+    Each request sleeps `latency` seconds (plus up to `jitter`) and fails with
+    a 503 with probability `error_rate`.
+    """
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                delay = fake.latency + random.uniform(0, fake.jitter)
+                fail = random.random() < fake.error_rate
+                with fake._lock:
+                    fake.requests += 1
+                    fake.errors += fail
+                if delay > 0:
+                    time.sleep(delay)
+                if fail:
+                    self._send(503, b"")
+                    return
+                bibkey = parse_qs(urlparse(self.path).query).get("bibkeys", [""])[0]
+                isbn = bibkey.split(":", 1)[-1]
+                body = {bibkey: {"title": f"Load Test Book {isbn}", "authors": [{"name": "Load Tester"}]}}
+                self._send(200, json.dumps(body).encode())
+
+            def _send(self, status, data):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_port}/api/books"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> 'FakeOpenLibraryServer':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ApiServer:
+    """Runs `uvicorn api:app` in a subprocess with its own data files and Open Library URL."""
+    def __init__(self, open_library_url: str, port: int | None = None, workers: int = 1,
+                 fetch_rate: float = 1000.0, fetch_in_flight: int = 32):
+        if workers != 1:
+            # Her süreç kataloğu kendi belleğinde tutar ve aynı dosyanın üzerine yazar; sonuçlar anlamsız olur
+            raise ValueError("The API keeps its catalog in process memory; only workers=1 gives valid results")
+        self.port = port or _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.workers = workers
+        self._tmp = tempfile.TemporaryDirectory(prefix="loadtest_")
+        self.env = dict(
+            os.environ,
+            OPEN_LIBRARY_URL=open_library_url,
+            OPEN_LIBRARY_RATE=str(fetch_rate),
+            OPEN_LIBRARY_BURST=str(max(1, int(fetch_rate))),
+            OPEN_LIBRARY_MAX_IN_FLIGHT=str(fetch_in_flight),
+            LIBRARY_DATA_FILE=os.path.join(self._tmp.name, "api_library_data.json"),
+            LIBRARIES_DIR=os.path.join(self._tmp.name, "libraries"),
+        )
+        self._process: subprocess.Popen | None = None
+
+    def start(self, timeout: float = 15.0) -> 'ApiServer':
+        cmd = [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1",
+               "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"]
+        self._process = subprocess.Popen(cmd, env=self.env, cwd=os.path.dirname(os.path.abspath(__file__)))
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                if requests.get(f"{self.url}/health", timeout=0.5).ok:
+                    return self
+            except requests.RequestException:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError("API did not become healthy in time")
+
+    def stop(self) -> None:
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        self._tmp.cleanup()
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[int, int] = field(default_factory=dict)
+
+    def summary(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies)
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "throughput": round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0,
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 when empty)."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    """Parses 'list=40,get=30,...' into operation weights."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown operation {name!r}; expected one of {sorted(ENDPOINTS)}")
+        mix[name] = int(weight)
+    if sum(mix.values()) <= 0:
+        raise ValueError("Mix weights must add up to a positive number")
+    return mix
+
+
+class Workload:
+    """Issues the mixed operations against a running API and records their latency.
+
+    Requests are scheduled open-loop at `rps`; latency is measured from the
+    scheduled start, so a saturated server shows up as queueing delay instead
+    of silently lowering the offered load.
+    """
+    def __init__(self, base_url: str, mix: dict[str, int] | None = None, concurrency: int = 64,
+                 rng: random.Random | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.mix = mix or dict(DEFAULT_MIX)
+        self.concurrency = concurrency
+        self.rng = rng or random.Random()
+        self.stats = {ENDPOINTS[name]: EndpointStats() for name in self.mix}
+        self._known: list[str] = []
+        self._isbns = itertools.count(9_790_000_000_000)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def seed(self, count: int) -> None:
+        """Adds `count` books up front so reads have something to hit."""
+        for _ in range(count):
+            isbn = str(next(self._isbns))
+            if self._session().post(f"{self.base_url}/books", json={"isbn": isbn}, timeout=30).ok:
+                self._known.append(isbn)
+
+    def run(self, rps: float, duration: float) -> dict:
+        names = list(self.mix)
+        weights = [self.mix[n] for n in names]
+        total = int(rps * duration)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for i in range(total):
+                scheduled = start + i / rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                op = self.rng.choices(names, weights)[0]
+                pool.submit(self._execute, op, scheduled)
+        elapsed = time.perf_counter() - start
+        return {
+            "target_rps": rps,
+            "duration_s": round(elapsed, 2),
+            "achieved_rps": round(sum(len(s.latencies) for s in self.stats.values()) / elapsed, 2),
+            "endpoints": {name: s.summary(elapsed) for name, s in self.stats.items() if s.latencies},
+        }
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _execute(self, op: str, scheduled: float) -> None:
+        session = self._session()
+        url = self.base_url
+        status = isbn = None
+        try:
+            if op == "list":
+                status = session.get(f"{url}/books", timeout=30).status_code
+            elif op == "get":
+                isbn = self._pick()
+                status = session.get(f"{url}/books/{isbn}", timeout=30).status_code
+            elif op == "search":
+                term = self.rng.choice(SEARCH_TERMS)
+                status = session.get(f"{url}/books/search", params={"q": term, "fuzzy": "true"},
+                                     timeout=30).status_code
+            elif op == "add":
+                isbn = str(next(self._isbns))
+                status = session.post(f"{url}/books", json={"isbn": isbn}, timeout=30).status_code
+                if status == 200:
+                    with self._lock:
+                        self._known.append(isbn)
+            elif op == "delete":
+                isbn = self._pick(remove=True)
+                status = session.delete(f"{url}/books/{isbn}", timeout=30).status_code
+        except requests.RequestException:
+            status = None
+        latency = time.perf_counter() - scheduled
+        failed = status is None or status >= 500 or (status >= 400 and op in ("add", "list", "search"))
+        if status == 404 and op in ("get", "delete") and isbn != NO_BOOK:
+            with self._lock:
+                # Silinmekte olan kitap için 404 beklenir; hâlâ bilinen ya da silmek üzere seçilen kitap kaybolmamalı
+                failed = op == "delete" or isbn in self._known
+
+        with self._lock:
+            stats = self.stats[ENDPOINTS[op]]
+            stats.latencies.append(latency)
+            key = status if status is not None else 0
+            stats.statuses[key] = stats.statuses.get(key, 0) + 1
+            if failed:
+                stats.errors += 1
+
+    def _pick(self, remove: bool = False) -> str:
+        with self._lock:
+            if not self._known:
+                return NO_BOOK
+            index = self.rng.randrange(len(self._known))
+            if remove:
+                return self._known.pop(index)
+            return self._known[index]
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Target {report['target_rps']} rps, achieved {report['achieved_rps']} rps "
+        f"over {report['duration_s']} s",
+        f"{'endpoint':<24}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}",
+    ]
+    for name, s in report["endpoints"].items():
+        lines.append(f"{name:<24}{s['requests']:>8}{s['errors']:>6}{s['throughput']:>9}"
+                     f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+    return "\n".join(lines)
+
+
+def run_load_test(rps: float = 50, duration: float = 10, mix: dict[str, int] | None = None,
+                  seed_books: int = 50, concurrency: int = 64, upstream_latency: float = 0.05,
+                  upstream_jitter: float = 0.0, upstream_error_rate: float = 0.0,
+                  api_url: str | None = None, workers: int = 1) -> dict:
+    """Runs one load test end to end and returns the report as a dict.
+
+    With `api_url` an already running API is targeted and no servers are started.
+    """
+    fake = api = None
+    try:
+        if api_url is None:
+            fake = FakeOpenLibraryServer(upstream_latency, upstream_jitter, upstream_error_rate).start()
+            api = ApiServer(fake.url, workers=workers).start()
+            api_url = api.url
+        workload = Workload(api_url, mix=mix, concurrency=concurrency)
+        workload.seed(seed_books)
+        report = workload.run(rps, duration)
+        if fake is not None:
+            report["upstream"] = {"requests": fake.requests, "injected_errors": fake.errors}
+        return report
+    finally:
+        if api is not None:
+            api.stop()
+        if fake is not None:
+            fake.stop()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the Library API against a fake Open Library.")
+    parser.add_argument("--rps", type=float, default=50, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load")
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX),
+                        help="operation weights, e.g. list=40,get=30,search=10,add=15,delete=5")
+    parser.add_argument("--seed-books", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=64, help="max client requests in flight")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="fake Open Library latency (s)")
+    parser.add_argument("--upstream-jitter", type=float, default=0.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0, help="fraction of 503s, 0-1")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="uvicorn worker processes; only 1 is supported while the API keeps its catalog in memory")
+    parser.add_argument("--api-url", default=None, help="target a running API instead of starting one")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    if args.workers != 1 and args.api_url is None:
+        parser.error("--workers > 1 is not supported: each worker would load and overwrite the same data file")
+
+    report = run_load_test(
+        rps=args.rps, duration=args.duration, mix=args.mix, seed_books=args.seed_books,
+        concurrency=args.concurrency, upstream_latency=args.upstream_latency,
+        upstream_jitter=args.upstream_jitter, upstream_error_rate=args.upstream_error_rate,
+        api_url=args.api_url, workers=args.workers,
+    )
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
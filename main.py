@@ -1,7 +1,11 @@
-from library import Library, Book, fetch_book_details_by_isbn
+from library import Library, Book
+from fetcher import OpenLibraryFetcher, FetchStatus
+from enrichment import EnrichmentJob, print_progress
 
 DATA_FILE = "library_data.json"
 
+fetcher = OpenLibraryFetcher()
+
 
 def prompt_non_empty(prompt_text: str) -> str:
     while True:
@@ -16,15 +20,17 @@ def add_book_flow(lib: Library) -> None:
     choice = input("ISBN ile otomatik doldur? (E/h): ").strip().lower()
     if choice == "e":
         isbn = prompt_non_empty("ISBN: ")
-        details = fetch_book_details_by_isbn(isbn)
-        if details:
-            title, authors = details
+        result = fetcher.fetch(isbn)
+        if result.ok:
+            title, authors = result.details
             print(f"Bulundu: {title} - {authors}")
             lib.add_book(Book(title=title, author=authors, isbn=isbn))
             print("Kitap eklendi.")
             return
-        else:
+        elif result.status is FetchStatus.NOT_FOUND:
             print("Open Library'de bulunamadı. Elle girişe geçiliyor.")
+        else:
+            print(f"Open Library'ye şu an ulaşılamıyor ({result.status.value}). Elle girişe geçiliyor.")
 
     title = prompt_non_empty("Başlık: ")
     author = prompt_non_empty("Yazar: ")
@@ -55,23 +61,58 @@ def list_books_flow(lib: Library) -> None:
 
 def search_book_flow(lib: Library) -> None:
     print("\n=== Kitap Ara ===")
-    query = prompt_non_empty("Başlık: ")
+    query = prompt_non_empty("Başlık veya yazar: ")
     book = lib.find_book(query)
     if book:
         print(f"Bulundu: {book.display_info()} [ISBN: {book.isbn}]")
+        return
+    suggestions = lib.search_books(query, limit=5)
+    if suggestions:
+        print("Tam eşleşme yok. Bunu mu demek istediniz?")
+        for idx, b in enumerate(suggestions, start=1):
+            print(f"{idx}. {b.display_info()} [ISBN: {b.isbn}]")
     else:
         print("Kitap bulunamadı.")
 
 
+def enrich_flow(lib: Library) -> None:
+    print("\n=== Meta Verileri Yenile ===")
+    job = EnrichmentJob(
+        lib,
+        fetcher,
+        checkpoint_path=f"{DATA_FILE}.enrich.json",
+        on_batch=lambda l: l.save_to_file(DATA_FILE),
+        on_progress=print_progress,
+    )
+    try:
+        progress = job.run()
+    except KeyboardInterrupt:
+        print("\nYarıda kesildi; tekrar çalıştırınca kaldığı yerden devam eder.")
+        return
+    print(f"\n{progress.updated} kitap güncellendi, {progress.not_found} bulunamadı, {progress.failed} hata.")
+
+
+def report_load_problems(lib: Library) -> None:
+    report = lib.load_report
+    if report is None or report.ok:
+        return
+    if report.file_error:
+        print(f"Uyarı: {DATA_FILE} bozuk ({report.file_error}); orijinali {DATA_FILE}.corrupt olarak saklandı.")
+    if report.errors:
+        print(f"Uyarı: {len(report.errors)} kayıt okunamadı ve atlandı; ayrıntılar: {report.quarantine_path}")
+
+
 def main() -> None:
     lib = Library.load_from_file(DATA_FILE, default_name="My Library")
+    report_load_problems(lib)
     while True:
         print("\n=== Menü ===")
         print("1. Kitap Ekle")
         print("2. Kitap Sil")
         print("3. Kitapları Listele")
         print("4. Kitap Ara")
-        print("5. Çıkış")
+        print("5. Meta Verileri Yenile")
+        print("6. Çıkış")
         choice = input("Seçiminiz: ").strip()
 
         if choice == "1":
@@ -85,11 +126,13 @@ def main() -> None:
         elif choice == "4":
             search_book_flow(lib)
         elif choice == "5":
+            enrich_flow(lib)
+        elif choice == "6":
             print("Güle güle!")
             lib.save_to_file(DATA_FILE)
             break
         else:
-            print("Geçersiz seçim. Lütfen 1-5 arası bir değer girin.")
+            print("Geçersiz seçim. Lütfen 1-6 arası bir değer girin.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+"""
+Hosts many named Library instances in one process (one catalog per branch).
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+import os
+import re
+import threading
+
+from library import Library, Book
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class LibraryRegistry:
+    """Loads libraries lazily from `<data_dir>/<name>.json` and evicts idle ones.
+
+    Loaded libraries are kept in LRU order. When the estimated footprint of the
+    loaded libraries exceeds `memory_budget_bytes`, the least recently used ones
+    are saved and dropped until it fits again (the library just accessed is
+    never evicted; one whose save fails stays loaded so its changes are not
+    lost). Dropped libraries are closed, so code that uses a library outside
+    the registry's own methods takes a `lease` on it; leased libraries are
+    not evicted until every lease ends. A global ISBN -> library names index answers cross-library lookups
+    without loading every catalog; it is built by scanning the data files once
+    and kept up to date by `add_book`/`remove_book`.
+
+    `max_resident_books` is passed on to every loaded library, so a large
+    catalog keeps only its hot books in memory; only resident books count
+    towards the estimate.
+    """
+    def __init__(self, data_dir: str, memory_budget_bytes: int = 256 * 1024 * 1024,
+                 bytes_per_book: int = 1024, max_resident_books: int | None = None):
+        self.data_dir = data_dir
+        self.max_resident_books = max_resident_books
+        self.memory_budget_bytes = memory_budget_bytes
+        self.bytes_per_book = bytes_per_book
+        self._loaded: OrderedDict[str, Library] = OrderedDict()
+        # Kütüphane adı -> onu kullanan istek sayısı; kullanımdaki kütüphane tahliye edilmez
+        self._leases: dict[str, int] = {}
+        self._isbn_index: dict[str, set[str]] | None = None
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.evictions = 0
+        self.save_failures = 0
+
+    @staticmethod
+    def validate_name(name: str) -> str:
+        if not _NAME_PATTERN.match(name or ""):
+            raise ValueError("Library name may only contain letters, digits, '-' and '_' (max 64)")
+        return name
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.data_dir, f"{self.validate_name(name)}.json")
+
+    def exists(self, name: str) -> bool:
+        with self._lock:
+            return name in self._loaded or os.path.exists(self.path_for(name))
+
+    def names(self) -> list[str]:
+        with self._lock:
+            names = set(self._loaded)
+            if os.path.isdir(self.data_dir):
+                names.update(f[:-5] for f in os.listdir(self.data_dir)
+                             if f.endswith(".json") and _NAME_PATTERN.match(f[:-5]))
+            return sorted(names)
+
+    def get(self, name: str, create: bool = False) -> Library:
+        """Returns the named library, loading it on first access.
+
+        Raises KeyError if it does not exist and `create` is False.
+        """
+        with self._lock:
+            lib = self._loaded.get(name)
+            if lib is not None:
+                self._loaded.move_to_end(name)
+                return lib
+            path = self.path_for(name)
+            if not os.path.exists(path) and not create:
+                raise KeyError(name)
+            lib = Library.load_from_file(path, default_name=name, max_resident_books=self.max_resident_books)
+            self._loaded[name] = lib
+            self.loads += 1
+            self._evict()
+            return lib
+
+    def checkout(self, name: str, create: bool = False) -> Library:
+        """Like `get`, but the library is not evicted until `checkin(name)` is called."""
+        with self._lock:
+            lib = self.get(name, create=create)
+            self._leases[name] = self._leases.get(name, 0) + 1
+            return lib
+
+    def checkin(self, name: str) -> None:
+        with self._lock:
+            count = self._leases.get(name, 0) - 1
+            if count > 0:
+                self._leases[name] = count
+            else:
+                self._leases.pop(name, None)
+
+    @contextmanager
+    def lease(self, name: str, create: bool = False):
+        """Yields the named library and keeps it loaded (and open) until the block ends."""
+        lib = self.checkout(name, create=create)
+        try:
+            yield lib
+        finally:
+            self.checkin(name)
+
+    def save(self, name: str) -> None:
+        with self._lock:
+            lib = self._loaded.get(name)
+            if lib is None:
+                return
+            os.makedirs(self.data_dir, exist_ok=True)
+            lib.save_to_file(self.path_for(name))
+
+    def add_book(self, name: str, book: Book) -> None:
+        with self._lock:
+            lib = self.get(name, create=True)
+            lib.add_book(book)
+            self._index().setdefault(book.isbn, set()).add(name)
+            self.save(name)
+            self._evict()
+
+    def remove_book(self, name: str, isbn: str) -> bool:
+        with self._lock:
+            lib = self.get(name)
+            if not lib.remove_book_by_isbn(isbn):
+                return False
+            if lib.find_book_by_isbn(isbn) is None:
+                owners = self._index().get(isbn)
+                if owners is not None:
+                    owners.discard(name)
+                    if not owners:
+                        del self._index()[isbn]
+            self.save(name)
+            return True
+
+    def find_by_isbn(self, isbn: str) -> list[tuple[str, Book]]:
+        """Looks the ISBN up in every library; only libraries that hold it are loaded."""
+        with self._lock:
+            owners = sorted(self._index().get(isbn, ()))
+            hits = []
+            for name in owners:
+                try:
+                    book = self.get(name).find_book_by_isbn(isbn)
+                except KeyError:
+                    continue
+                if book is not None:
+                    hits.append((name, book))
+            return hits
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": list(self._loaded),
+                "estimated_bytes": self._estimated_bytes(),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "save_failures": self.save_failures,
+                "indexed_isbns": len(self._isbn_index) if self._isbn_index is not None else None,
+            }
+
+    def close(self) -> None:
+        """Saves and unloads every library.
+
+        Libraries that could not be saved stay loaded and OSError is raised.
+        """
+        with self._lock:
+            failed = []
+            for name in list(self._loaded):
+                self.save(name)
+                if self._loaded[name].is_dirty:
+                    failed.append(name)
+                    continue
+                self._loaded.pop(name).close()
+            if failed:
+                self.save_failures += len(failed)
+                raise OSError(f"Could not save libraries: {', '.join(failed)}")
+
+    # --- Internal helpers ---
+    def _estimate(self, lib: Library) -> int:
+        return lib.resident_books * self.bytes_per_book
+
+    def _estimated_bytes(self) -> int:
+        return sum(self._estimate(lib) for lib in self._loaded.values())
+
+    def _evict(self) -> None:
+        total = self._estimated_bytes()
+        # En son kullanılan kütüphane hiçbir zaman tahliye edilmez
+        for name in list(self._loaded)[:-1]:
+            if total <= self.memory_budget_bytes:
+                break
+            if name in self._leases:
+                # Bir istek hâlâ kullanıyor; kapatılırsa istek yarıda kalır
+                continue
+            lib = self._loaded[name]
+            self.save(name)
+            if lib.is_dirty:
+                # Kayıt başarısız: kaydedilmemiş değişiklikler kaybolmasın diye bellekte kalır
+                self.save_failures += 1
+                continue
+            del self._loaded[name]
+            lib.close()
+            total -= self._estimate(lib)
+            self.evictions += 1
+
+    def _index(self) -> dict[str, set[str]]:
+        if self._isbn_index is None:
+            index: dict[str, set[str]] = {}
+            for name in self.names():
+                lib = self._loaded.get(name)
+                if lib is not None:
+                    isbns = [b.isbn for b in lib.list_books()]
+                else:
+                    isbns = _scan_isbns(self.path_for(name))
+                for isbn in isbns:
+                    index.setdefault(isbn, set()).add(name)
+            self._isbn_index = index
+        return self._isbn_index
+
+
+def _scan_isbns(path: str) -> list[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return [b.get("isbn", "") for b in data.get("books", []) if isinstance(b, dict)]
+    except Exception:
+        return []
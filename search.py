@@ -0,0 +1,267 @@
+"""
+Typo-tolerant title/author search backed by a character trigram index.
+"""
+
+from collections import Counter
+import heapq
+import re
+import unicodedata
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from library import Book
+
+FIELDS = ("title", "author")
+
+# Words up to this length are also indexed by their single-character deletions,
+# because one typo can destroy every trigram of a short word
+SHORT_WORD_LENGTH = 6
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+# NFKD does not decompose these, so they would otherwise be dropped
+_FOLD = str.maketrans({"ı": "i", "İ": "i", "ß": "ss", "ø": "o", "Ø": "o", "ł": "l", "Ł": "l"})
+
+
+def normalize(text: str) -> str:
+    """Lowercases, strips accents and collapses punctuation into single spaces."""
+    text = unicodedata.normalize("NFKD", (text or "").translate(_FOLD)).encode("ascii", "ignore").decode("ascii")
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int | None:
+    """Edit distance between `a` and `b`, or None as soon as it must exceed `max_distance`.
+
+    Adjacent transpositions ("ie" -> "ei") count as a single edit
+    (optimal string alignment distance).
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    before = None
+    previous = list(range(len(a) + 1))
+    previous_min = 0
+    for j, cb in enumerate(b, start=1):
+        current = [j]
+        row_min = j
+        for i, ca in enumerate(a, start=1):
+            value = min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (ca != cb))
+            if before is not None and i > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                value = min(value, before[i - 2] + 1)
+            current.append(value)
+            row_min = min(row_min, value)
+        # Transpozisyon iki satır geriye baktığı için iki satır üst üste sınırı aşmalı
+        if row_min > max_distance and previous_min > max_distance:
+            return None
+        before, previous, previous_min = previous, current, row_min
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+def default_max_distance(word: str) -> int:
+    """Allowed typos for a query word: none up to 2 characters, one up to 5, two beyond."""
+    if len(word) <= 2:
+        return 0
+    if len(word) <= 5:
+        return 1
+    return 2
+
+
+class FuzzyIndex:
+    """Typo-tolerant index over book titles and authors.
+
+    Trigrams are indexed per distinct word (the vocabulary), not per book, so
+    each query word is first matched against a vocabulary that is much smaller
+    than the catalog. Vocabulary candidates are pruned with the q-gram lemma
+    (two words within edit distance k share at least `max(len) - 4k` of
+    their trigrams; an edit touches at most three, a transposition four) and
+    a length filter, then verified with bounded Levenshtein. Short words are
+    also indexed by their one-character deletions, which finds single typos
+    that leave no trigram intact ("dnue" -> "dune").
+
+    Books must match every query word in one field and are ranked by the sum
+    of the per-word distances, then by the length of the matching field. The
+    allowed distance is raised one step at a time, so wide typo scans only
+    run when closer matches cannot fill `limit`.
+    """
+    def __init__(self, resolve: 'Callable[[int], Book] | None' = None):
+        # `resolve` ile kitaplar anahtarla saklanır ve sonuçta geri çözülür; indeks kitapları bellekte tutmaz
+        self._resolve = resolve
+        self._docs: dict[int, 'Book'] = {}
+        self._terms: dict[int, dict[str, tuple[str, ...]]] = {}
+        self._word_docs: dict[str, dict[str, set[int]]] = {f: {} for f in FIELDS}
+        self._word_refs: dict[str, int] = {}
+        self._gram_words: dict[str, set[str]] = {}
+        self._deletes: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add(self, book: 'Book', key: int | None = None) -> None:
+        """Indexes `book` under `key` (defaults to the object's id)."""
+        doc_id = id(book) if key is None else key
+        if doc_id in self._terms:
+            self.remove(book, key=doc_id)
+        if self._resolve is None:
+            self._docs[doc_id] = book
+        terms = {
+            "title": tuple(normalize(book.title).split()),
+            "author": tuple(normalize(book.author).split()),
+        }
+        self._terms[doc_id] = terms
+        for field, words in terms.items():
+            word_docs = self._word_docs[field]
+            for word in set(words):
+                word_docs.setdefault(word, set()).add(doc_id)
+                self._add_word_ref(word)
+
+    def remove(self, book: 'Book', key: int | None = None) -> None:
+        doc_id = id(book) if key is None else key
+        terms = self._terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._docs.pop(doc_id, None)
+        for field, words in terms.items():
+            word_docs = self._word_docs[field]
+            for word in set(words):
+                ids = word_docs.get(word)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del word_docs[word]
+                self._drop_word_ref(word)
+
+    def update(self, book: 'Book', key: int | None = None) -> None:
+        """Re-indexes a book whose title or author changed."""
+        self.add(book, key=key)
+
+    def search(self, query: str, limit: int = 10, field: str = "any",
+               max_distance: int | None = None) -> list[tuple['Book', int]]:
+        """Returns up to `limit` (book, distance) pairs, best matches first.
+
+        `max_distance` bounds the edit distance per query word; by default it
+        grows with the word length.
+        """
+        if field != "any" and field not in FIELDS:
+            raise ValueError(f"field must be 'any' or one of {FIELDS}")
+        query_words = list(dict.fromkeys(normalize(query).split()))
+        if not query_words:
+            return []
+        limits = [default_max_distance(w) if max_distance is None else max_distance for w in query_words]
+
+        # Önce tam eşleşmeler, sonra artan hata payı: yakın sonuçlar yeterliyse geniş taramaya gerek yok
+        best: dict[int, tuple[int, int]] = {}
+        cache: dict[tuple[str, int], dict[str, int]] = {}
+        for level in range(max(limits) + 1):
+            matches = []
+            for word, k in zip(query_words, limits):
+                key = (word, min(level, k))
+                if key not in cache:
+                    cache[key] = self._match_word(*key)
+                matches.append(cache[key])
+            if not all(matches):
+                continue
+            best = {}
+            for name in (FIELDS if field == "any" else (field,)):
+                for doc_id, distance in self._rank_field(name, matches).items():
+                    # Eşit mesafede daha kısa alan daha isabetlidir ("hobit" -> "The Hobbit")
+                    ranking = (distance, len(self._terms[doc_id][name]))
+                    if doc_id not in best or ranking < best[doc_id]:
+                        best[doc_id] = ranking
+            if len(best) >= limit:
+                break
+
+        top = heapq.nsmallest(
+            limit, best.items(), key=lambda item: (item[1], self._terms[item[0]]["title"])
+        )
+        lookup = self._resolve or self._docs.__getitem__
+        return [(lookup(doc_id), ranking[0]) for doc_id, ranking in top]
+
+    def _rank_field(self, field: str, matches: list[dict[str, int]]) -> dict[int, int]:
+        """Books whose `field` contains a match for every query word, with summed distances."""
+        word_docs = self._word_docs[field]
+        # En az kitaba dağılan sorgu kelimesinden başla; diğerlerini kitap üzerinde doğrula
+        sizes = [sum(len(word_docs.get(w, ())) for w in m) for m in matches]
+        order = sorted(range(len(matches)), key=sizes.__getitem__)
+        seed = matches[order[0]]
+        scores: dict[int, int] = {}
+        for word, distance in seed.items():
+            for doc_id in word_docs.get(word, ()):
+                if doc_id not in scores or distance < scores[doc_id]:
+                    scores[doc_id] = distance
+        for index in order[1:]:
+            wanted = matches[index]
+            for doc_id in list(scores):
+                hits = [wanted[w] for w in self._terms[doc_id][field] if w in wanted]
+                if hits:
+                    scores[doc_id] += min(hits)
+                else:
+                    del scores[doc_id]
+        return scores
+
+    def _match_word(self, word: str, max_distance: int) -> dict[str, int]:
+        """Vocabulary words within `max_distance` of `word`, mapped to their distance."""
+        if max_distance == 0:
+            return {word: 0} if word in self._word_refs else {}
+        candidates = set()
+        if len(word) <= SHORT_WORD_LENGTH + 1:
+            for variant in (word, *_deletions(word)):
+                candidates.update(self._deletes.get(variant, ()))
+        # Tek hatada, kısa kelimelerin silme dizini eksiksizdir; zayıf trigram taramasına gerek yok
+        if max_distance > 1 or len(word) >= SHORT_WORD_LENGTH:
+            grams = _word_trigrams(word)
+            counts = Counter()
+            for gram in grams:
+                counts.update(self._gram_words.get(gram, ()))
+            # Dolgulu bir kelimenin trigram sayısı uzunluğuna eşittir
+            slack = 4 * max_distance
+            candidates.update(
+                w for w, n in counts.items()
+                if abs(len(w) - len(word)) <= max_distance and n >= max(len(grams), len(w)) - slack
+            )
+        found = {}
+        for candidate in candidates:
+            distance = bounded_levenshtein(word, candidate, max_distance)
+            if distance is not None:
+                found[candidate] = distance
+        return found
+
+    def _add_word_ref(self, word: str) -> None:
+        refs = self._word_refs.get(word, 0)
+        self._word_refs[word] = refs + 1
+        if refs:
+            return
+        for gram in _word_trigrams(word):
+            self._gram_words.setdefault(gram, set()).add(word)
+        if len(word) <= SHORT_WORD_LENGTH:
+            for variant in (word, *_deletions(word)):
+                self._deletes.setdefault(variant, set()).add(word)
+
+    def _drop_word_ref(self, word: str) -> None:
+        refs = self._word_refs.get(word, 0) - 1
+        if refs > 0:
+            self._word_refs[word] = refs
+            return
+        self._word_refs.pop(word, None)
+        for gram in _word_trigrams(word):
+            words = self._gram_words.get(gram)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self._gram_words[gram]
+        if len(word) <= SHORT_WORD_LENGTH:
+            for variant in (word, *_deletions(word)):
+                words = self._deletes.get(variant)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self._deletes[variant]
+
+
+def _word_trigrams(word: str) -> set[str]:
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _deletions(word: str) -> set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
@@ -0,0 +1,101 @@
+"""
+On-disk store for books that do not fit in a library's memory budget.
+"""
+
+from dataclasses import dataclass, asdict
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+@dataclass
+class ResidencyStats:
+    """Counters for a library's working set of resident books."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    spill_writes: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class SpillStore:
+    """SQLite table of serialized book records keyed by the library's internal slot id.
+
+    Without `path` a temporary file is used and deleted when the store is
+    closed or garbage collected.
+    """
+    def __init__(self, path: str | None = None):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="library_spill_", suffix=".sqlite3")
+            os.close(fd)
+            self._finalizer = weakref.finalize(self, _remove_file, path)
+        else:
+            self._finalizer = None
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # Yalnızca geçici önbellek: çökmeye karşı dayanıklılık gerekmez, kaynak dosya asıl veridir
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS books (slot INTEGER PRIMARY KEY, record TEXT NOT NULL)")
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def put_many(self, items: list[tuple[int, dict]]) -> None:
+        if not items:
+            return
+        rows = [(slot, _ENCODER.encode(record)) for slot, record in items]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO books (slot, record) VALUES (?, ?)", rows)
+            self._conn.execute("COMMIT")
+
+    def put(self, slot: int, record: dict) -> None:
+        self.put_many([(slot, record)])
+
+    def get(self, slot: int) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM books WHERE slot = ?", (slot,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, slots: list[int]) -> dict[int, dict]:
+        if not slots:
+            return {}
+        placeholders = ",".join("?" * len(slots))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT slot, record FROM books WHERE slot IN ({placeholders})", slots
+            ).fetchall()
+        return {slot: json.loads(record) for slot, record in rows}
+
+    def delete(self, slot: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM books WHERE slot = ?", (slot,))
+
+    def size_bytes(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -8,20 +8,23 @@ from fastapi.testclient import TestClient
 from unittest.mock import patch
 import json
 import os
+import time
 from api import app, DATA_FILE
+from fetcher import FetchResult, FetchStatus
 
 client = TestClient(app)
 
 # Test data
 VALID_ISBN = "9780140328721"
 INVALID_ISBN = "0000000000"
-MOCK_BOOK_DATA = ("Test Book Title", "Test Author")
+MOCK_BOOK_DATA = FetchResult(FetchStatus.FOUND, details=("Test Book Title", "Test Author"))
 
 @pytest.fixture(autouse=True)
-def cleanup_test_data(monkeypatch):
+def cleanup_test_data(monkeypatch, tmp_path):
     """Clean up test data files and reset library state before and after each test."""
     import uuid
     from library import Library
+    from registry import LibraryRegistry
     test_file = f"test_api_library_{uuid.uuid4().hex[:8]}.json"
     
     # Patch the DATA_FILE constant in the api module
@@ -30,6 +33,8 @@ def cleanup_test_data(monkeypatch):
     # Reset the library instance to be empty for each test
     fresh_library = Library("Test Library")
     monkeypatch.setattr("api.library", fresh_library)
+    monkeypatch.setattr("api.enrichment_job", None)
+    monkeypatch.setattr("api.registry", LibraryRegistry(str(tmp_path / "libraries")))
     
     # Clean up before test
     if os.path.exists(test_file):
@@ -58,13 +63,70 @@ def test_health_check():
     assert data["status"] == "healthy"
     assert "library_name" in data
 
+def test_memory_stats_with_budget(monkeypatch, tmp_path):
+    """Test GET /stats/memory reports resident and spilled books."""
+    from library import Library, Book
+    lib = Library("Test Library", max_resident_books=2, spill_path=str(tmp_path / "spill.sqlite3"))
+    for i in range(5):
+        lib.add_book(Book(f"Book {i}", "Author", f"isbn-{i}"))
+    monkeypatch.setattr("api.library", lib)
+
+    assert client.get("/books/isbn-0").json()["title"] == "Book 0"
+    assert len(client.get("/books").json()) == 5
+
+    data = client.get("/stats/memory").json()
+    assert data["total_books"] == 5
+    assert data["resident_books"] == 2
+    assert data["spilled_books"] == 3
+    assert data["max_resident_books"] == 2
+    assert data["misses"] == 1
+
 def test_get_books_empty():
     """Test GET /books returns empty list initially."""
     response = client.get("/books")
     assert response.status_code == 200
     assert response.json() == []
 
-@patch("api.fetch_book_details_by_isbn")
+def test_slow_upstream_does_not_block_other_requests():
+    """Test a POST waiting on Open Library does not freeze the event loop."""
+    import threading
+    started, release = threading.Event(), threading.Event()
+
+    def slow_fetch(isbn):
+        started.set()
+        release.wait(5)
+        return MOCK_BOOK_DATA
+
+    with patch("api.fetcher.fetch", side_effect=slow_fetch), TestClient(app) as shared:
+        poster = threading.Thread(target=shared.post, args=("/books",), kwargs={"json": {"isbn": VALID_ISBN}})
+        poster.start()
+        assert started.wait(2)
+        begin = time.monotonic()
+        assert shared.get("/health").status_code == 200
+        assert time.monotonic() - begin < 2
+        release.set()
+        poster.join()
+
+def test_held_library_lock_does_not_block_other_requests():
+    """Test routes waiting for the library lock (e.g. during a save) do not freeze the event loop."""
+    import threading
+    import api
+    with TestClient(app) as shared, api.library.lock:
+        readers = [
+            threading.Thread(target=shared.get, args=("/books",)),
+            threading.Thread(target=shared.delete, args=(f"/books/{VALID_ISBN}",)),
+            threading.Thread(target=shared.get, args=(f"/books/{VALID_ISBN}",)),
+        ]
+        for reader in readers:
+            reader.start()
+        time.sleep(0.2)
+        begin = time.monotonic()
+        assert shared.get("/health").status_code == 200
+        assert time.monotonic() - begin < 1
+    for reader in readers:
+        reader.join()
+
+@patch("api.fetcher.fetch")
 def test_add_book_success(mock_fetch):
     """Test POST /books successfully adds a book."""
     mock_fetch.return_value = MOCK_BOOK_DATA
@@ -79,10 +141,10 @@ def test_add_book_success(mock_fetch):
     assert data["is_borrowed"] == False
     assert data["book_type"] == "Book"
 
-@patch("api.fetch_book_details_by_isbn")
+@patch("api.fetcher.fetch")
 def test_add_book_not_found(mock_fetch):
     """Test POST /books with ISBN not found in Open Library."""
-    mock_fetch.return_value = None
+    mock_fetch.return_value = FetchResult(FetchStatus.NOT_FOUND)
     
     response = client.post("/books", json={"isbn": INVALID_ISBN})
     assert response.status_code == 404
@@ -94,7 +156,7 @@ def test_add_book_empty_isbn():
     assert response.status_code == 400
     assert "ISBN cannot be empty" in response.json()["detail"]
 
-@patch("api.fetch_book_details_by_isbn")
+@patch("api.fetcher.fetch")
 def test_add_duplicate_book(mock_fetch):
     """Test POST /books with duplicate ISBN."""
     mock_fetch.return_value = MOCK_BOOK_DATA
@@ -108,7 +170,7 @@ def test_add_duplicate_book(mock_fetch):
     assert response2.status_code == 409
     assert "already exists" in response2.json()["detail"]
 
-@patch("api.fetch_book_details_by_isbn")
+@patch("api.fetcher.fetch")
 def test_get_books_with_data(mock_fetch):
     """Test GET /books returns list of books after adding some."""
     mock_fetch.return_value = MOCK_BOOK_DATA
@@ -124,7 +186,7 @@ def test_get_books_with_data(mock_fetch):
     assert len(books) == 1
     assert books[0]["isbn"] == VALID_ISBN
 
-@patch("api.fetch_book_details_by_isbn")
+@patch("api.fetcher.fetch")
 def test_get_book_by_isbn(mock_fetch):
     """Test GET /books/{isbn} returns specific book."""
     mock_fetch.return_value = MOCK_BOOK_DATA
@@ -146,7 +208,7 @@ def test_get_book_by_isbn_not_found():
     assert response.status_code == 404
     assert "not found in library" in response.json()["detail"]
 
-@patch("api.fetch_book_details_by_isbn")
+@patch("api.fetcher.fetch")
 def test_delete_book_success(mock_fetch):
     """Test DELETE /books/{isbn} successfully removes book."""
     mock_fetch.return_value = MOCK_BOOK_DATA
@@ -178,7 +240,7 @@ def test_delete_book_empty_isbn():
     assert response.status_code == 400
     assert "ISBN cannot be empty" in response.json()["detail"]
 
-@patch("api.fetch_book_details_by_isbn")
+@patch("api.fetcher.fetch")
 def test_full_workflow(mock_fetch):
     """Test complete workflow: add, get, delete."""
     mock_fetch.return_value = MOCK_BOOK_DATA
@@ -205,7 +267,7 @@ def test_full_workflow(mock_fetch):
 
 def test_api_persistence():
     """Test that API data persists to file."""
-    with patch("api.fetch_book_details_by_isbn") as mock_fetch:
+    with patch("api.fetcher.fetch") as mock_fetch:
         mock_fetch.return_value = MOCK_BOOK_DATA
         
         # Add a book
@@ -223,3 +285,117 @@ def test_api_persistence():
             data = json.load(f)
             assert len(data["books"]) == 1
             assert data["books"][0]["isbn"] == VALID_ISBN
+
+@patch("api.fetcher.fetch")
+def test_add_book_upstream_unavailable(mock_fetch):
+    """Test POST /books reports upstream failures instead of a 404."""
+    mock_fetch.return_value = FetchResult(FetchStatus.CIRCUIT_OPEN, error="open")
+    response = client.post("/books", json={"isbn": VALID_ISBN})
+    assert response.status_code == 503
+
+    mock_fetch.return_value = FetchResult(FetchStatus.UPSTREAM_ERROR, error="timeout")
+    response = client.post("/books", json={"isbn": VALID_ISBN})
+    assert response.status_code == 502
+
+    mock_fetch.return_value = FetchResult(FetchStatus.RATE_LIMITED, error="429")
+    response = client.post("/books", json={"isbn": VALID_ISBN})
+    assert response.status_code == 429
+
+@patch("api.fetcher.fetch")
+def test_enrichment_endpoint(mock_fetch):
+    """Test POST /enrichment refreshes metadata in the background and GET reports progress."""
+    import api
+    from library import Book
+    api.library.add_book(Book(title="Old Title", author="Old Author", isbn=VALID_ISBN))
+    mock_fetch.return_value = MOCK_BOOK_DATA
+
+    assert client.get("/enrichment").json()["state"] == "idle"
+
+    response = client.post("/enrichment", json={"workers": 2, "batch_size": 10})
+    assert response.status_code == 202
+
+    for _ in range(100):
+        status = client.get("/enrichment").json()
+        if status["state"] == "completed":
+            break
+        time.sleep(0.01)
+    assert status["state"] == "completed"
+    assert status["updated"] == 1
+    assert api.library.find_book_by_isbn(VALID_ISBN).title == "Test Book Title"
+
+@patch("api.fetcher.fetch")
+def test_failed_enrichment_can_be_restarted(mock_fetch):
+    """Test an enrichment job that crashes ends as failed and does not block new jobs."""
+    import api
+    from library import Book
+    api.library.add_book(Book(title="Old Title", author="Old Author", isbn=VALID_ISBN))
+    mock_fetch.side_effect = RuntimeError("boom")
+
+    assert client.post("/enrichment", json={}).status_code == 202
+    for _ in range(100):
+        status = client.get("/enrichment").json()
+        if status["state"] != "running":
+            break
+        time.sleep(0.01)
+    assert status["state"] == "failed"
+    assert status["error"] == "RuntimeError: boom"
+    assert client.post("/enrichment", json={}).status_code == 202
+
+def test_search_books_fuzzy():
+    """Test GET /books/search with and without fuzzy matching."""
+    import api
+    from library import Book
+    api.library.add_book(Book(title="The Hobbit", author="J.R.R. Tolkien", isbn=VALID_ISBN))
+    api.library.add_book(Book(title="Dune", author="Frank Herbert", isbn="9780441013593"))
+
+    response = client.get("/books/search", params={"q": "Tolkein"})
+    assert response.status_code == 200
+    assert response.json() == []
+
+    response = client.get("/books/search", params={"q": "Tolkein", "fuzzy": "true"})
+    assert response.status_code == 200
+    assert [b["title"] for b in response.json()] == ["The Hobbit"]
+
+    response = client.get("/books/search", params={"q": "herb", "field": "author"})
+    assert [b["title"] for b in response.json()] == ["Dune"]
+
+    response = client.get("/books/search", params={"q": "dune", "field": "isbn"})
+    assert response.status_code == 422
+
+@patch("api.fetcher.fetch")
+def test_named_library_routes(mock_fetch):
+    """Test /libraries/{name}/books routes keep branch catalogs separate."""
+    mock_fetch.return_value = MOCK_BOOK_DATA
+
+    assert client.get("/libraries/kadikoy/books").status_code == 404
+
+    response = client.post("/libraries/kadikoy/books", json={"isbn": VALID_ISBN})
+    assert response.status_code == 200
+    response = client.post("/libraries/kadikoy/books", json={"isbn": VALID_ISBN})
+    assert response.status_code == 409
+    client.post("/libraries/besiktas/books", json={"isbn": VALID_ISBN})
+    client.post("/libraries/besiktas/books", json={"isbn": "9780441013593"})
+
+    assert client.get("/libraries").json() == ["besiktas", "kadikoy"]
+    assert len(client.get("/libraries/kadikoy/books").json()) == 1
+    assert len(client.get("/libraries/besiktas/books").json()) == 2
+    assert client.get("/books").json() == []
+
+    response = client.get(f"/libraries/kadikoy/books/{VALID_ISBN}")
+    assert response.json()["title"] == "Test Book Title"
+
+    hits = client.get(f"/isbn/{VALID_ISBN}").json()
+    assert [hit["library"] for hit in hits] == ["besiktas", "kadikoy"]
+
+    response = client.delete(f"/libraries/kadikoy/books/{VALID_ISBN}")
+    assert response.status_code == 200
+    assert client.get(f"/libraries/kadikoy/books/{VALID_ISBN}").status_code == 404
+    assert [hit["library"] for hit in client.get(f"/isbn/{VALID_ISBN}").json()] == ["besiktas"]
+
+    stats = client.get("/libraries/stats").json()
+    assert sorted(stats["loaded"]) == ["besiktas", "kadikoy"]
+
+def test_named_library_invalid_name():
+    """Test library names that could escape the data directory are rejected."""
+    response = client.post("/libraries/bad.name/books", json={"isbn": VALID_ISBN})
+    assert response.status_code == 400
@@ -0,0 +1,142 @@
+import json
+import threading
+
+from enrichment import EnrichmentJob
+from fetcher import FetchResult, FetchStatus
+from library import Library, Book
+
+
+class StubFetcher:
+    """Answers lookups from a dict; ISBNs mapped to a FetchStatus return that status instead."""
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def fetch(self, isbn):
+        with self._lock:
+            self.calls.append(isbn)
+        answer = self.answers.get(isbn, FetchStatus.NOT_FOUND)
+        if isinstance(answer, FetchStatus):
+            return FetchResult(answer)
+        return FetchResult(FetchStatus.FOUND, details=answer)
+
+
+def make_library(count):
+    lib = Library("Test")
+    for i in range(count):
+        lib.add_book(Book(title=f"old {i}", author="unknown", isbn=f"isbn-{i}"))
+    return lib
+
+
+def test_enrichment_updates_books_in_batches():
+    lib = make_library(5)
+    fetcher = StubFetcher({f"isbn-{i}": (f"Title {i}", "Author") for i in range(4)})
+    batches = []
+    job = EnrichmentJob(lib, fetcher, workers=3, batch_size=2, on_batch=lambda l: batches.append(1))
+
+    progress = job.run()
+
+    assert progress.state == "completed"
+    assert progress.processed == 5
+    assert progress.updated == 4
+    assert progress.not_found == 1
+    assert len(batches) == 3
+    assert lib.find_book_by_isbn("isbn-0").title == "Title 0"
+    assert lib.find_book_by_isbn("isbn-4").title == "old 4"
+    assert progress.to_dict()["throughput"] >= 0
+
+
+def test_enrichment_resumes_from_checkpoint(tmp_path):
+    checkpoint = tmp_path / "enrich.json"
+    checkpoint.write_text(json.dumps({"done": ["isbn-0", "isbn-1"]}))
+    lib = make_library(3)
+    fetcher = StubFetcher({f"isbn-{i}": (f"Title {i}", "Author") for i in range(3)})
+
+    progress = EnrichmentJob(lib, fetcher, checkpoint_path=str(checkpoint)).run()
+
+    assert fetcher.calls == ["isbn-2"]
+    assert progress.total == 1
+    assert not checkpoint.exists()
+
+
+def test_enrichment_stops_when_circuit_opens(tmp_path):
+    checkpoint = tmp_path / "enrich.json"
+    lib = make_library(4)
+    fetcher = StubFetcher({"isbn-0": ("Title 0", "Author"), "isbn-1": FetchStatus.CIRCUIT_OPEN})
+
+    progress = EnrichmentJob(lib, fetcher, batch_size=2, checkpoint_path=str(checkpoint)).run()
+
+    assert progress.state == "interrupted"
+    assert progress.failed == 1
+    assert sorted(fetcher.calls) == ["isbn-0", "isbn-1"]
+    # Failed lookups are not checkpointed so the next run retries them
+    assert json.loads(checkpoint.read_text())["done"] == ["isbn-0"]
+
+
+def test_enrichment_skips_books_without_isbn():
+    lib = Library("Test")
+    lib.add_book(Book(title="No ISBN", author="Someone", isbn=""))
+    fetcher = StubFetcher({})
+
+    progress = EnrichmentJob(lib, fetcher).run()
+
+    assert progress.skipped == 1
+    assert fetcher.calls == []
+
+
+def test_enrichment_failure_ends_job_instead_of_leaving_it_running():
+    lib = make_library(3)
+
+    def broken_save(library):
+        raise OSError("disk full")
+
+    progress = EnrichmentJob(lib, StubFetcher({}), batch_size=2, on_batch=broken_save).run()
+
+    assert progress.state == "failed"
+    assert progress.error == "OSError: disk full"
+    assert progress.finished_at is not None
+
+
+def test_enrichment_loads_spilled_books_one_batch_at_a_time(tmp_path):
+    import gc
+    lib = Library("Test", max_resident_books=3, spill_path=str(tmp_path / "spill.sqlite3"))
+    for i in range(40):
+        lib.add_book(Book(title=f"old {i}", author="unknown", isbn=f"isbn-{i}"))
+    live_books = []
+
+    class CountingFetcher(StubFetcher):
+        def fetch(self, isbn):
+            live_books.append(sum(isinstance(o, Book) for o in gc.get_objects()))
+            return super().fetch(isbn)
+
+    fetcher = CountingFetcher({f"isbn-{i}": (f"Title {i}", "Author") for i in range(40)})
+    gc.collect()
+    before = sum(isinstance(o, Book) for o in gc.get_objects())
+    progress = EnrichmentJob(lib, fetcher, workers=1, batch_size=4).run()
+
+    assert progress.state == "completed"
+    assert progress.total == 40 and progress.updated == 40
+    # Bellekteki kitapların üstüne en fazla bir parti ve bir okuma parçası
+    assert max(live_books) - before <= 8
+    assert lib.resident_books == 3
+    assert [b.title for b in lib.list_books()] == [f"Title {i}" for i in range(40)]
+
+
+def test_enrichment_ignores_books_deleted_during_lookup():
+    lib = make_library(2)
+    lib.build_search_index()
+
+    class DeletingFetcher(StubFetcher):
+        def fetch(self, isbn):
+            if isbn == "isbn-0":
+                lib.remove_book_by_isbn("isbn-0")
+            return super().fetch(isbn)
+
+    fetcher = DeletingFetcher({f"isbn-{i}": (f"Title {i}", "Author") for i in range(2)})
+    progress = EnrichmentJob(lib, fetcher, workers=1).run()
+
+    assert progress.state == "completed"
+    assert lib.find_book_by_isbn("isbn-0") is None
+    assert lib.total_books == 1
+    assert [b.isbn for b in lib.search_books("title")] == ["isbn-1"]
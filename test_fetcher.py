@@ -0,0 +1,198 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from fetcher import CircuitBreaker, FetchStatus, OpenLibraryFetcher, TokenBucket
+
+BOOKS = {
+    "9780140328721": {"title": "Matilda", "authors": [{"name": "Roald Dahl"}]},
+    "9780000000002": {"title": "Malformed", "authors": [{"name": 42}]},
+}
+
+
+class FakeOpenLibrary:
+    """Local stand-in for the Open Library books API; `script` queues status codes to return first."""
+    def __init__(self):
+        self.script = []
+        self.hits = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = 0.0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with fake._lock:
+                    fake.hits += 1
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                    status = fake.script.pop(0) if fake.script else 200
+                try:
+                    if fake.delay:
+                        threading.Event().wait(fake.delay)
+                    if status != 200:
+                        self.send_response(status)
+                        if status == 429:
+                            self.send_header("Retry-After", "0")
+                        self.end_headers()
+                        return
+                    bibkey = parse_qs(urlparse(self.path).query)["bibkeys"][0]
+                    isbn = bibkey.split(":", 1)[1]
+                    body = {bibkey: BOOKS[isbn]} if isbn in BOOKS else {}
+                    data = json.dumps(body).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/books"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_server():
+    server = FakeOpenLibrary()
+    yield server
+    server.close()
+
+
+def make_fetcher(url, **kwargs):
+    options = dict(rate_per_second=1000, burst=100, backoff_base=0.001, backoff_max=0.01, timeout=2)
+    options.update(kwargs)
+    return OpenLibraryFetcher(base_url=url, **options)
+
+
+def test_fetch_found(fake_server):
+    result = make_fetcher(fake_server.url).fetch("9780140328721")
+    assert result.status is FetchStatus.FOUND
+    assert result.details == ("Matilda", "Roald Dahl")
+    assert result.attempts == 1
+
+
+def test_fetch_not_found_is_not_retried(fake_server):
+    result = make_fetcher(fake_server.url).fetch("0000000000")
+    assert result.status is FetchStatus.NOT_FOUND
+    assert fake_server.hits == 1
+
+
+def test_fetch_empty_isbn_does_not_hit_network(fake_server):
+    result = make_fetcher(fake_server.url).fetch("  ")
+    assert result.status is FetchStatus.INVALID_ISBN
+    assert fake_server.hits == 0
+
+
+def test_transient_errors_are_retried(fake_server):
+    fake_server.script = [503, 429]
+    result = make_fetcher(fake_server.url).fetch("9780140328721")
+    assert result.status is FetchStatus.FOUND
+    assert result.attempts == 3
+
+
+def test_retries_exhausted_reports_last_error(fake_server):
+    fake_server.script = [500] * 10
+    result = make_fetcher(fake_server.url, max_retries=2).fetch("9780140328721")
+    assert result.status is FetchStatus.UPSTREAM_ERROR
+    assert result.attempts == 3
+
+
+def test_connection_error_is_upstream_error():
+    fetcher = make_fetcher("http://127.0.0.1:9/api/books", max_retries=1)
+    result = fetcher.fetch("9780140328721")
+    assert result.status is FetchStatus.UPSTREAM_ERROR
+
+
+def test_circuit_breaker_fails_fast(fake_server):
+    fake_server.script = [500] * 10
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    fetcher = make_fetcher(fake_server.url, max_retries=5, breaker=breaker)
+
+    result = fetcher.fetch("9780140328721")
+    assert result.status is FetchStatus.CIRCUIT_OPEN
+    assert fake_server.hits == 2
+
+    result = fetcher.fetch("9780140328721")
+    assert result.status is FetchStatus.CIRCUIT_OPEN
+    assert fake_server.hits == 2
+
+
+def test_circuit_breaker_half_open_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    now[0] = 10.0
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # only one trial call while half-open
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_malformed_payload_is_upstream_error_and_keeps_breaker_usable(fake_server):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    fetcher = make_fetcher(fake_server.url, max_retries=0, breaker=breaker)
+
+    result = fetcher.fetch("9780000000002")
+    assert result.status is FetchStatus.UPSTREAM_ERROR
+    assert fetcher.fetch("9780140328721").status is FetchStatus.FOUND
+
+
+def test_half_open_trial_is_released_when_call_ends_without_verdict(fake_server):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    fetcher = make_fetcher(fake_server.url, breaker=breaker)
+
+    def explode(isbn):
+        raise RuntimeError("bug")
+    fetcher._request = explode
+    with pytest.raises(RuntimeError):
+        fetcher.fetch("9780140328721")
+    assert breaker.allow_request()
+
+    # Yerel hız sınırı dolunca deneme hakkı hiç alınmamalı
+    breaker.release_trial()
+    limited = make_fetcher(fake_server.url, rate_per_second=0.001, burst=1, acquire_timeout=0, breaker=breaker)
+    limited.bucket.try_acquire()
+    assert limited.fetch("9780140328721").status is FetchStatus.RATE_LIMITED
+    assert breaker.allow_request()
+
+
+def test_token_bucket_limits_rate():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    now[0] = 0.5
+    assert bucket.try_acquire()
+    assert not bucket.acquire(timeout=0)
+
+
+def test_max_in_flight_is_respected(fake_server):
+    fake_server.delay = 0.05
+    fetcher = make_fetcher(fake_server.url, max_in_flight=2)
+    threads = [threading.Thread(target=fetcher.fetch, args=("9780140328721",)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert fake_server.hits == 6
+    assert fake_server.max_in_flight <= 2
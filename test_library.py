@@ -1,5 +1,7 @@
+import json
+import os
 import pytest
-from library import Book, fetch_book_details_by_isbn
+from library import Book, Library, fetch_book_details_by_isbn
 from unittest.mock import patch
 
 
@@ -33,6 +35,25 @@ def test_cannot_return_if_not_borrowed():
         book.return_book()
 
 
+def test_library_search_books_tracks_add_and_remove():
+    lib = Library("Test")
+    lib.add_book(Book("The Hobbit", "J.R.R. Tolkien", "978-0345339683"))
+    assert [b.title for b in lib.search_books("Tolkein")] == ["The Hobbit"]
+
+    lib.remove_book_by_isbn("978-0345339683")
+    assert lib.search_books("Tolkein") == []
+
+
+def test_update_book_details_reindexes():
+    lib = Library("Test")
+    book = Book("Old Title", "Someone", "1")
+    lib.add_book(book)
+    lib.update_book_details(book, "Dune", "Frank Herbert")
+    assert book.title == "Dune"
+    assert lib.search_books("old title") == []
+    assert lib.search_books("herbet") == [book]
+
+
 @patch("library.requests.get")
 def test_fetch_book_details_by_isbn_success(mock_get):
     mock_get.return_value.raise_for_status.return_value = None
@@ -63,3 +84,269 @@ def test_fetch_book_details_by_isbn_network_error(mock_get):
     assert result is None
 
 
+
+
+def make_saved_library(tmp_path):
+    lib = Library("Test")
+    for i in range(20):
+        lib.add_book(Book(f"Book {i}", "Author", f"isbn-{i}"))
+    path = str(tmp_path / "library.json")
+    lib.save_to_file(path)
+    return lib, path
+
+
+def test_new_changes_make_library_dirty(tmp_path):
+    lib, _ = make_saved_library(tmp_path)
+    assert lib.is_dirty is False
+
+    lib.find_book_by_isbn("isbn-3").borrow_book()
+    assert lib.is_dirty is True
+
+
+def test_save_to_file_is_noop_when_clean(tmp_path):
+    lib, path = make_saved_library(tmp_path)
+    os.remove(path)
+    lib.save_to_file(path)
+    assert not os.path.exists(path)
+
+    lib.remove_book_by_isbn("isbn-0")
+    lib.save_to_file(path)
+    assert Library.load_from_file(path).total_books == 19
+
+
+def test_loaded_library_is_clean(tmp_path):
+    _, path = make_saved_library(tmp_path)
+    lib = Library.load_from_file(path)
+    assert lib.is_dirty is False
+
+    # Farklı bir dosyaya kayıt değişiklik olmasa da yazılmalı
+    other = str(tmp_path / "copy.json")
+    lib.save_to_file(other)
+    assert Library.load_from_file(other).total_books == 20
+
+
+def test_segmented_save_rewrites_only_changed_segments(tmp_path):
+    lib, _ = make_saved_library(tmp_path)
+    lib.segment_count = 8
+    directory = str(tmp_path / "segments")
+
+    assert lib.save_to_directory(directory) == 8
+    assert lib.save_to_directory(directory) == 0
+
+    lib.find_book_by_isbn("isbn-5").borrow_book()
+    assert lib.save_to_directory(directory) == 1
+
+    lib.remove_book_by_isbn("isbn-6")
+    lib.add_book(Book("New", "Author", "isbn-99"))
+    assert lib.save_to_directory(directory) <= 2
+
+    loaded = Library.load_from_directory(directory)
+    assert loaded.is_dirty is False
+    assert loaded.total_books == 20
+    assert loaded.find_book_by_isbn("isbn-5").is_borrowed is True
+    assert loaded.find_book_by_isbn("isbn-6") is None
+    assert loaded.find_book_by_isbn("isbn-99").title == "New"
+
+
+def test_segment_count_change_rewrites_everything(tmp_path):
+    lib, _ = make_saved_library(tmp_path)
+    directory = str(tmp_path / "segments")
+    lib.segment_count = 8
+    lib.save_to_directory(directory)
+
+    lib.segment_count = 4
+    assert lib.save_to_directory(directory) == 4
+    assert sorted(os.listdir(directory)) == [
+        "manifest.json", "segment-0000.json", "segment-0001.json", "segment-0002.json", "segment-0003.json",
+    ]
+    assert Library.load_from_directory(directory).total_books == 20
+
+
+def write_json(tmp_path, data):
+    path = tmp_path / "library.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def test_load_with_report_valid_file(tmp_path):
+    lib, path = make_saved_library(tmp_path)
+    loaded, report = Library.load_with_report(path)
+    assert report.ok
+    assert report.loaded == 20
+    assert [b.isbn for b in loaded.list_books()] == [b.isbn for b in lib.list_books()]
+
+
+def test_load_reports_invalid_records_instead_of_dropping_silently(tmp_path):
+    path = write_json(tmp_path, {"name": "Test", "books": [
+        {"kind": "Book", "title": "Dune", "author": "Frank Herbert", "isbn": "1"},
+        {"kind": "AudioBook", "title": "Becoming", "author": "Michelle Obama", "isbn": "2", "duration": "long"},
+        {"kind": "Scroll", "title": "Old", "author": "Someone", "isbn": "3"},
+        {"kind": "EBook", "title": "1984", "author": "George Orwell", "isbn": "4", "file_format": "EPUB"},
+    ]})
+
+    lib, report = Library.load_with_report(path, quarantine=True)
+
+    assert [b.isbn for b in lib.list_books()] == ["1", "4"]
+    assert report.loaded == 2
+    assert [e.index for e in report.errors] == [1, 2]
+    assert "duration" in report.errors[0].message
+    with open(report.quarantine_path, encoding="utf-8") as f:
+        quarantined = json.load(f)["records"]
+    assert [r["record"]["isbn"] for r in quarantined] == ["2", "3"]
+
+
+def test_load_salvages_records_from_corrupt_json(tmp_path):
+    _, path = make_saved_library(tmp_path)
+    with open(path, "rb") as f:
+        raw = f.read()
+    # Tek bir bozuk bayt yalnızca o kaydı kaybettirmeli
+    position = raw.index(b'"Book 7"')
+    with open(path, "wb") as f:
+        f.write(raw[:position] + b"x" + raw[position + 1:])
+
+    lib = Library.load_from_file(path)
+
+    assert lib.name == "Test"
+    assert lib.total_books == 19
+    assert lib.find_book_by_isbn("isbn-7") is None
+    assert lib.load_report.salvaged
+    assert [e.index for e in lib.load_report.errors] == [7]
+    assert os.path.exists(f"{path}.corrupt")
+
+
+def test_from_dict_skips_invalid_records():
+    lib = Library.from_dict({"name": "Test", "books": [{"title": "No ISBN", "author": "A"}, {
+        "title": "Dune", "author": "Frank Herbert", "isbn": "1", "is_borrowed": True}]})
+    assert lib.total_books == 1
+    assert lib.find_book_by_isbn("1").is_borrowed is True
+
+
+def test_memory_budget_spills_cold_books_transparently(tmp_path):
+    lib = Library("Test", max_resident_books=5, spill_path=str(tmp_path / "spill.sqlite3"))
+    for i in range(20):
+        lib.add_book(Book(f"Book {i}", "Author", f"isbn-{i}"))
+
+    assert lib.resident_books == 5
+    assert lib.total_books == 20
+    assert [b.isbn for b in lib.list_books()] == [f"isbn-{i}" for i in range(20)]
+    # Tam tarama çalışma kümesini değiştirmemeli
+    assert lib.resident_books == 5
+    assert lib.find_book_by_isbn("isbn-0").title == "Book 0"
+    assert lib.search_books("Book 3", limit=1)[0].isbn == "isbn-3"
+
+    stats = lib.memory_stats()
+    assert stats["spilled_books"] == 15
+    assert stats["misses"] >= 1
+    assert stats["evictions"] >= 15
+
+
+def test_changes_to_spilled_books_are_kept(tmp_path):
+    lib, path = make_saved_library(tmp_path)
+    lib = Library.load_from_file(path, max_resident_books=3)
+    assert lib.resident_books == 3
+
+    # list_books diskteki kitapları yükleyerek döndürür; değişiklikler yine de kaybolmamalı
+    lib.list_books()[1].borrow_book()
+    lib.find_book_by_isbn("isbn-2").borrow_book()
+    for i in range(10, 20):
+        lib.find_book_by_isbn(f"isbn-{i}")
+    assert lib.find_book_by_isbn("isbn-1").is_borrowed is True
+    assert lib.find_book_by_isbn("isbn-2").is_borrowed is True
+
+    lib.remove_book_by_isbn("isbn-5")
+    lib.save_to_file(path)
+    reloaded = Library.load_from_file(path)
+    assert reloaded.total_books == 19
+    assert [b.isbn for b in reloaded.list_books() if b.is_borrowed] == ["isbn-1", "isbn-2"]
+
+    lib.set_memory_budget(None)
+    assert lib.resident_books == 19
+    assert lib.memory_stats()["spill_bytes"] == 0
+
+
+def test_spilled_book_has_a_single_live_object(tmp_path):
+    lib, path = make_saved_library(tmp_path)
+    lib = Library.load_from_file(path, max_resident_books=3)
+
+    # Zenginleştirme işi gibi: diskteki kitabın nesnesini tutarken başka bir istek onu öne alır ve ödünç verir
+    held = lib.list_books()[0]
+    promoted = lib.find_book_by_isbn("isbn-0")
+    assert promoted is held
+    promoted.borrow_book()
+    lib.update_book_details(held, "New title", "New author")
+    for i in range(10, 20):
+        lib.find_book_by_isbn(f"isbn-{i}")
+
+    book = lib.find_book_by_isbn("isbn-0")
+    assert (book.title, book.is_borrowed) == ("New title", True)
+    lib.save_to_file(path)
+    saved = Library.load_from_file(path).find_book_by_isbn("isbn-0")
+    assert (saved.title, saved.is_borrowed) == ("New title", True)
+
+
+
+def test_change_during_save_is_not_marked_clean(tmp_path, monkeypatch):
+    import threading
+    import library
+    lib, path = make_saved_library(tmp_path)
+    book = lib.find_book_by_isbn("isbn-3")
+    lib.remove_book_by_isbn("isbn-0")
+    real_write = library._atomic_write_json
+    borrower = threading.Thread(target=book.borrow_book)
+
+    def write_while_borrowing(*args, **kwargs):
+        # Kayıt sürerken başka bir iş parçacığı kitabı değiştirir
+        borrower.start()
+        borrower.join(0.2)
+        real_write(*args, **kwargs)
+
+    monkeypatch.setattr(library, "_atomic_write_json", write_while_borrowing)
+    lib.save_to_file(path)
+    borrower.join()
+
+    assert lib.is_dirty is True
+    monkeypatch.setattr(library, "_atomic_write_json", real_write)
+    lib.save_to_file(path)
+    assert Library.load_from_file(path).find_book_by_isbn("isbn-3").is_borrowed is True
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".tmp")]
+
+
+def test_loaded_books_are_built_on_first_access(tmp_path):
+    _, path = make_saved_library(tmp_path)
+    lib = Library.load_from_file(path)
+    assert lib.resident_books == 20
+
+    book = lib.find_book_by_isbn("isbn-4")
+    assert lib.list_books()[4] is book
+    assert lib.list_books()[5] is lib.find_book_by_isbn("isbn-5")
+    book.borrow_book()
+    assert lib.is_dirty is True
+
+
+def test_search_index_build_picks_up_concurrent_changes(tmp_path, monkeypatch):
+    import threading
+    import library
+    lib, _ = make_saved_library(tmp_path)
+    calls = []
+
+    class MutatingIndex(library.FuzzyIndex):
+        def add(self, book, key=None):
+            if not calls:
+                # Kurulum sırasında başka bir iş parçacığı kütüphaneyi değiştirir; kilit tutulmadığı için beklemez
+                worker = threading.Thread(target=lambda: (
+                    lib.update_book_details(lib.find_book_by_isbn("isbn-19"), "Zanzibar Nights", "Author"),
+                    lib.add_book(Book("Quixotic Quest", "Author", "isbn-new")),
+                    lib.remove_book_by_isbn("isbn-18"),
+                ))
+                worker.start()
+                worker.join(2)
+                calls.append(worker.is_alive())
+            super().add(book, key=key)
+
+    monkeypatch.setattr(library, "FuzzyIndex", MutatingIndex)
+    lib.build_search_index()
+
+    assert calls == [False]
+    assert [b.isbn for b in lib.search_books("zanzibar")] == ["isbn-19"]
+    assert [b.isbn for b in lib.search_books("quixotic")] == ["isbn-new"]
+    assert "isbn-18" not in [b.isbn for b in lib.search_books("book 18", limit=20)]
@@ -0,0 +1,77 @@
+import pytest
+import requests
+
+from loadtest import (
+    ApiServer, FakeOpenLibraryServer, Workload, format_report, parse_mix, percentile, run_load_test,
+)
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([0.2], 99) == 0.2
+    assert percentile([], 50) == 0.0
+
+
+def test_parse_mix():
+    assert parse_mix("list=3, add=1") == {"list": 3, "add": 1}
+    with pytest.raises(ValueError):
+        parse_mix("upload=1")
+    with pytest.raises(ValueError):
+        parse_mix("list=0")
+
+
+def test_fake_open_library_server():
+    fake = FakeOpenLibraryServer(latency=0).start()
+    try:
+        response = requests.get(fake.url, params={"bibkeys": "ISBN:123", "format": "json"}, timeout=5)
+        assert response.json()["ISBN:123"]["authors"][0]["name"] == "Load Tester"
+
+        fake.error_rate = 1.0
+        response = requests.get(fake.url, params={"bibkeys": "ISBN:123"}, timeout=5)
+        assert response.status_code == 503
+        assert fake.requests == 2
+        assert fake.errors == 1
+    finally:
+        fake.stop()
+
+
+def test_run_load_test_end_to_end():
+    report = run_load_test(rps=20, duration=1, seed_books=3, upstream_latency=0,
+                           mix={"list": 1, "get": 1, "add": 1})
+
+    assert report["achieved_rps"] > 0
+    assert set(report["endpoints"]) <= {"GET /books", "GET /books/{isbn}", "POST /books"}
+    for stats in report["endpoints"].values():
+        assert stats["errors"] == 0
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+    assert report["upstream"]["requests"] >= 3
+    assert "p99 ms" in format_report(report)
+
+
+def test_multiple_workers_are_rejected():
+    with pytest.raises(ValueError):
+        ApiServer("http://127.0.0.1:9/api/books", workers=2)
+
+
+def test_missing_known_books_count_as_errors():
+    class NotFound:
+        status_code = 404
+
+    class Session:
+        def get(self, *args, **kwargs):
+            return NotFound()
+        delete = get
+
+    workload = Workload("http://api.invalid", mix={"get": 1, "delete": 1})
+    workload._local.session = Session()
+    workload._known = ["111", "222"]
+    workload._execute("get", 0.0)
+    workload._execute("delete", 0.0)
+    workload._execute("delete", 0.0)
+    workload._execute("get", 0.0)
+
+    assert workload.stats["GET /books/{isbn}"].errors == 1
+    assert workload.stats["DELETE /books/{isbn}"].errors == 2
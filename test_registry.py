@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from library import Book, Library
+from registry import LibraryRegistry
+
+
+def write_library(tmp_path, name, isbns):
+    lib = Library(name)
+    for isbn in isbns:
+        lib.add_book(Book(title=f"Book {isbn}", author="Author", isbn=isbn))
+    lib.save_to_file(str(tmp_path / f"{name}.json"))
+
+
+def test_libraries_load_lazily(tmp_path):
+    write_library(tmp_path, "kadikoy", ["1", "2"])
+    registry = LibraryRegistry(str(tmp_path))
+    assert registry.stats()["loaded"] == []
+
+    lib = registry.get("kadikoy")
+    assert lib.total_books == 2
+    assert registry.get("kadikoy") is lib
+    assert registry.loads == 1
+
+
+def test_missing_library_raises_unless_created(tmp_path):
+    registry = LibraryRegistry(str(tmp_path))
+    with pytest.raises(KeyError):
+        registry.get("besiktas")
+    assert registry.get("besiktas", create=True).total_books == 0
+
+
+def test_invalid_names_are_rejected(tmp_path):
+    registry = LibraryRegistry(str(tmp_path))
+    with pytest.raises(ValueError):
+        registry.get("../etc")
+
+
+def test_lru_eviction_under_memory_budget(tmp_path):
+    for name in ("a", "b", "c"):
+        write_library(tmp_path, name, [f"{name}1", f"{name}2"])
+    # Her kütüphane 2 kitap * 100 bayt; bütçe yalnızca ikisine yetiyor
+    registry = LibraryRegistry(str(tmp_path), memory_budget_bytes=400, bytes_per_book=100)
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")
+
+    assert registry.stats()["loaded"] == ["a", "c"]
+    assert registry.evictions == 1
+
+
+def test_evicted_library_is_saved(tmp_path):
+    registry = LibraryRegistry(str(tmp_path), memory_budget_bytes=100, bytes_per_book=100)
+    registry.add_book("a", Book(title="Dune", author="Frank Herbert", isbn="9780441013593"))
+    registry.add_book("b", Book(title="Matilda", author="Roald Dahl", isbn="9780140328721"))
+
+    assert registry.stats()["loaded"] == ["b"]
+    with open(tmp_path / "a.json", encoding="utf-8") as f:
+        assert json.load(f)["books"][0]["title"] == "Dune"
+    assert registry.get("a").find_book_by_isbn("9780441013593").title == "Dune"
+
+
+def test_library_that_fails_to_save_is_not_evicted(tmp_path, monkeypatch):
+    import library
+    for name in ("a", "b"):
+        write_library(tmp_path, name, [f"{name}1"])
+    registry = LibraryRegistry(str(tmp_path), memory_budget_bytes=100, bytes_per_book=100)
+    registry.get("a").find_book_by_isbn("a1").borrow_book()
+
+    def failing_write(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(library, "_atomic_write_json", failing_write)
+    registry.get("b")
+    assert registry.stats()["loaded"] == ["a", "b"]
+    assert registry.save_failures == 1
+    with pytest.raises(OSError):
+        registry.close()
+
+    monkeypatch.undo()
+    registry.get("b")
+    assert registry.stats()["loaded"] == ["b"]
+    with open(tmp_path / "a.json", encoding="utf-8") as f:
+        assert json.load(f)["books"][0]["is_borrowed"] is True
+
+
+def test_cross_library_isbn_lookup(tmp_path):
+    write_library(tmp_path, "kadikoy", ["1", "2"])
+    write_library(tmp_path, "besiktas", ["2", "3"])
+    registry = LibraryRegistry(str(tmp_path))
+
+    assert [name for name, _ in registry.find_by_isbn("2")] == ["besiktas", "kadikoy"]
+    assert registry.find_by_isbn("404") == []
+
+    registry.add_book("uskudar", Book(title="New", author="Author", isbn="3"))
+    assert [name for name, _ in registry.find_by_isbn("3")] == ["besiktas", "uskudar"]
+
+    assert registry.remove_book("besiktas", "3")
+    assert [name for name, _ in registry.find_by_isbn("3")] == ["uskudar"]
+
+
+def test_names_include_unloaded_libraries(tmp_path):
+    write_library(tmp_path, "kadikoy", [])
+    registry = LibraryRegistry(str(tmp_path))
+    registry.get("moda", create=True)
+    assert registry.names() == ["kadikoy", "moda"]
+
+
+def test_evicted_and_closed_libraries_release_spill_files(tmp_path):
+    import gc
+    import os
+    for name in ("a", "b", "c"):
+        write_library(tmp_path, name, [f"{name}{i}" for i in range(5)])
+    registry = LibraryRegistry(str(tmp_path), memory_budget_bytes=200, bytes_per_book=100, max_resident_books=2)
+    gc.disable()
+    try:
+        spill_a = registry.get("a")._store.path
+        registry.get("b")
+        spill_b = registry.get("b")._store.path
+        registry.get("c")
+        assert registry.stats()["loaded"] == ["c"]
+        assert not os.path.exists(spill_a)
+        assert not os.path.exists(spill_b)
+
+        spill_c = registry.get("c")._store.path
+        registry.close()
+        assert not os.path.exists(spill_c)
+    finally:
+        gc.enable()
+
+
+def test_leased_library_is_not_evicted_while_in_use(tmp_path):
+    for name in ("a", "b", "c"):
+        write_library(tmp_path, name, [f"{name}{i}" for i in range(5)])
+    registry = LibraryRegistry(str(tmp_path), memory_budget_bytes=200, bytes_per_book=100, max_resident_books=2)
+
+    with registry.lease("a") as lib:
+        registry.get("b")
+        registry.get("c")
+        assert "a" in registry.stats()["loaded"]
+        # Diskteki kitaplar hâlâ okunabilir: kütüphane kapatılmadı
+        assert [b.isbn for b in lib.list_books()] == [f"a{i}" for i in range(5)]
+
+    registry.get("b")
+    assert "a" not in registry.stats()["loaded"]
@@ -0,0 +1,74 @@
+from library import Book
+from search import FuzzyIndex, bounded_levenshtein, normalize
+
+
+def make_index():
+    index = FuzzyIndex()
+    books = [
+        Book("The Hobbit", "J.R.R. Tolkien", "1"),
+        Book("The Lord of the Rings", "J.R.R. Tolkien", "2"),
+        Book("Dune", "Frank Herbert", "3"),
+        Book("Matilda", "Roald Dahl", "4"),
+    ]
+    for book in books:
+        index.add(book)
+    return index, books
+
+
+def titles(results):
+    return [book.title for book, _ in results]
+
+
+def test_normalize_strips_accents_and_punctuation():
+    assert normalize("  Çalıkuşu — Reşat Nuri! ") == "calikusu resat nuri"
+
+
+def test_bounded_levenshtein():
+    assert bounded_levenshtein("kitten", "sitting", 3) == 3
+    assert bounded_levenshtein("kitten", "sitting", 2) is None
+    assert bounded_levenshtein("tolkein", "tolkien", 1) == 1  # transposition
+    assert bounded_levenshtein("abc", "abcdef", 2) is None
+
+
+def test_fuzzy_author_search_tolerates_typos():
+    index, _ = make_index()
+    assert titles(index.search("Tolkein")) == ["The Hobbit", "The Lord of the Rings"]
+    assert titles(index.search("herbet", field="author")) == ["Dune"]
+
+
+def test_fuzzy_title_search():
+    index, _ = make_index()
+    assert titles(index.search("hobit"))[0] == "The Hobbit"
+    assert titles(index.search("lord of teh rings")) == ["The Lord of the Rings"]
+    assert titles(index.search("dnue")) == ["Dune"]
+
+
+def test_exact_matches_rank_first():
+    index, _ = make_index()
+    results = index.search("matilda")
+    assert results[0][0].title == "Matilda"
+    assert results[0][1] == 0
+
+
+def test_field_restriction_and_limit():
+    index, _ = make_index()
+    assert index.search("tolkien", field="title") == []
+    assert len(index.search("tolkien", limit=1)) == 1
+
+
+def test_no_match():
+    index, _ = make_index()
+    assert index.search("xyzzy quux") == []
+    assert index.search("   ") == []
+
+
+def test_remove_and_update_are_incremental():
+    index, books = make_index()
+    index.remove(books[2])
+    assert index.search("dune") == []
+    assert len(index) == 3
+
+    books[3].title = "Charlie and the Chocolate Factory"
+    index.update(books[3])
+    assert index.search("matilda") == []
+    assert titles(index.search("chocolat")) == ["Charlie and the Chocolate Factory"]